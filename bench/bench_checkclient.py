@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+u"""Misst Aufbau und Arbeitszyklus des 'watch modus' ohne RevPi.
+
+Für jede Anzahl IOs wird ein XML-RPC Server mit einem erzeugten piCtory
+Layout gestartet. Die Ergebnisse werden als JSON-Zeilen ausgegeben.
+
+Aufruf: python3 bench/bench_checkclient.py [iocount ...]
+
+"""
+
+__author__ = "Sven Sager"
+__copyright__ = "Copyright (C) 2018 Sven Sager"
+__license__ = "GPLv3"
+
+import json
+import os
+import pickle
+import sys
+import tkinter
+import tracemalloc
+from threading import Thread
+from time import perf_counter
+from xmlrpc.client import Binary, ServerProxy
+from xmlrpc.server import SimpleXMLRPCServer
+
+sys.path.insert(0, os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "revpipycontrol"
+))
+from revpicheckclient import RevPiCheckClient
+
+
+class _StubRevPi():
+
+    u"""Stellt ein piCtory Layout mit iocount IOs ohne RevPi bereit."""
+
+    def __init__(self, iocount):
+        u"""Erzeugt Devices mit gemischten Bit-, Byte- und Word-IOs.
+
+        Es werden bis zu 10 Devices angelegt, die IOs reihum als 4 Bits
+        in einem Byte, Byte und Word, mit und ohne Vorzeichen.
+
+        @param iocount Anzahl aller Inputs und Outputs
+
+        """
+        devcount = max(1, min(10, iocount // 100))
+        self.lst_devices = []
+        self.dict_inps = {}
+        self.dict_outs = {}
+        address = 0
+        for dev in range(devcount):
+            self.lst_devices.append([dev, "Device {0}".format(dev)])
+            for dict_io in (self.dict_inps, self.dict_outs):
+                lst_io = []
+                iorange = iocount // devcount // 2
+                i = 0
+                kind = 0
+                while i < iorange:
+                    if kind == 0:
+                        # 4 Bits teilen sich ein Byte
+                        for bit in range(min(4, iorange - i)):
+                            lst_io.append([
+                                "Bit_{0}_{1}".format(dev, i), 1,
+                                address, "", bit, "little", False
+                            ])
+                            i += 1
+                        address += 1
+                    else:
+                        lst_io.append([
+                            "Int_{0}_{1}".format(dev, i), kind,
+                            address, "", -1,
+                            "big" if i % 4 == 3 else "little",
+                            i % 2 == 1
+                        ])
+                        address += kind
+                        i += 1
+                    kind = (kind + 1) % 3
+                dict_io[dev] = lst_io
+        self.imglen = address
+
+    def get_pictoryrsc(self):
+        return Binary(pickle.dumps(self.lst_devices))
+
+    def psstart(self):
+        return True
+
+    def ps_devices(self):
+        return self.lst_devices
+
+    def ps_inps(self):
+        return Binary(pickle.dumps(self.dict_inps))
+
+    def ps_outs(self):
+        return Binary(pickle.dumps(self.dict_outs))
+
+    def ps_setvalue(self, device, io, value):
+        return 0
+
+    def ps_values(self):
+        # Jeder Abruf liefert ein neues Prozessabbild
+        return Binary(os.urandom(self.imglen))
+
+
+def _timed(dict_tm, name):
+    u"""Ersetzt eine Methode durch eine Variante mit Zeitmessung."""
+    func = getattr(RevPiCheckClient, name)
+
+    def wrapper(*args, **kwargs):
+        tm_start = perf_counter()
+        rc = func(*args, **kwargs)
+        dict_tm[name] += perf_counter() - tm_start
+        return rc
+
+    setattr(RevPiCheckClient, name, wrapper)
+
+
+def _runbench(root, url):
+    u"""Baut den watch modus auf und führt einen Arbeitszyklus aus.
+    @return RevPiCheckClient und Dauer des Zyklus"""
+    app = RevPiCheckClient(root, ServerProxy(url), 3, xmlurl=url)
+    for dev in app.lst_devices:
+        app._createdevwin(dev)
+
+    # Einen kompletten Zyklus über alle Devices messen
+    app.lst_active = list(app.lst_devices)
+    app._RevPiCheckClient__fullrefresh = True
+    tm_start = perf_counter()
+    app._workvalues()
+    return app, perf_counter() - tm_start
+
+
+if __name__ == "__main__":
+    # Aufruf: bench_checkclient.py [iocount ...], Ausgabe als JSON-Zeilen
+    lst_counts = [int(arg) for arg in sys.argv[1:]] or \
+        [10, 100, 500, 1000, 2000, 5000]
+    dict_tm = dict.fromkeys(("__init__", "_createwidgets", "_createiogroup"))
+    for name in dict_tm:
+        _timed(dict_tm, name)
+
+    root = tkinter.Tk()
+    root.withdraw()
+    for iocount in lst_counts:
+        stub = _StubRevPi(iocount)
+        srv = SimpleXMLRPCServer(
+            ("127.0.0.1", 0), logRequests=False, allow_none=True
+        )
+        srv.register_introspection_functions()
+        srv.register_instance(stub)
+        th_srv = Thread(target=srv.serve_forever, daemon=True)
+        th_srv.start()
+        url = "http://127.0.0.1:{0}".format(srv.server_address[1])
+
+        # Zeiten ohne tracemalloc messen
+        dict_tm.update({k: 0.0 for k in dict_tm})
+        app, tm_work = _runbench(root, url)
+
+        lst_io = [
+            io for dict_io in (app.dict_inps, app.dict_outs)
+            for dev in dict_io for io in dict_io[dev]
+        ]
+        tm_start = perf_counter()
+        for io in lst_io:
+            app.maxint(io)
+            app.minint(io)
+        tm_minmax = perf_counter() - tm_start
+
+        result = {
+            "iocount": len(lst_io),
+            "devices": len(app.lst_devices),
+            "imglen": stub.imglen,
+            "construct_s": dict_tm["__init__"],
+            "createwidgets_s": dict_tm["_createwidgets"],
+            "createiogroup_s": dict_tm["_createiogroup"],
+            "minmax_s": tm_minmax,
+            "workvalues_s": tm_work,
+            "decode_s": app.tm_decode,
+            "rtt_s": app.rtt,
+        }
+        app.destroy()
+
+        # Speicherspitze in einem zweiten Durchlauf ermitteln
+        tracemalloc.start()
+        app, tm_work = _runbench(root, url)
+        result["peak_kib"] = tracemalloc.get_traced_memory()[1] // 1024
+        tracemalloc.stop()
+        app.destroy()
+
+        srv.shutdown()
+        srv.server_close()
+        print(json.dumps(result), flush=True)
+
+    root.destroy()
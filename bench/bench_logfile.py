@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+u"""Misst den Download großer Logdateien ohne RevPi.
+
+Ein XML-RPC Server stellt eine erzeugte Logdatei mit optionaler Latenz
+bereit. Verglichen werden der bisherige Download mit bytes +=, der
+Download in Blöcken, die adaptive Blockgröße und das Laden des Endes
+beim Öffnen des Fensters. Die Ergebnisse werden als JSON-Zeilen
+ausgegeben.
+
+Aufruf: python3 bench/bench_logfile.py [MiB] [Latenz ms]
+
+"""
+
+__author__ = "Sven Sager"
+__copyright__ = "Copyright (C) 2018 Sven Sager"
+__license__ = "GPLv3"
+
+import json
+import os
+import sys
+import tracemalloc
+from threading import Thread
+from time import perf_counter, sleep
+from xmlrpc.client import Binary, ServerProxy
+from xmlrpc.server import SimpleXMLRPCServer
+
+sys.path.insert(0, os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "revpipycontrol"
+))
+from revpilogfile import _fetchlog, _tailposition
+
+
+def _createlog(size):
+    u"""Erzeugt eine Logdatei mit mindestens size MiB.
+
+    @param size Größe in MiB
+    @return Logdatei als <class 'bytes'>
+
+    """
+    line = "2018-01-01 12:00:00 INFO Ausgänge gesetzt, Zyklus {0:08d}\n"
+    lst_lines = []
+    cnt_bytes = 0
+    while cnt_bytes < size * 1048576:
+        lst_lines.append(line.format(len(lst_lines)))
+        cnt_bytes += len(lst_lines[-1].encode("utf-8"))
+    return "".join(lst_lines).encode("utf-8")
+
+
+def _fetchlog_concat(xmlcall, startposition, loadblock):
+    u"""Bisheriger Download mit bytes += als Vergleich.
+
+    @param xmlcall XML-RPC Funktion load_applog oder load_plclog
+    @param startposition Position ab der gelesen wird
+    @param loadblock Anzahl Bytes pro Aufruf
+    @return tuple(Text, neue Position, None)
+
+    """
+    logbytes = b''
+    while True:
+        bytebuff = xmlcall(startposition, loadblock).data
+        logbytes += bytebuff
+        startposition += len(bytebuff)
+        if len(bytebuff) < loadblock:
+            break
+    return logbytes.decode("utf-8"), startposition, None
+
+
+if __name__ == "__main__":
+    # Aufruf: bench_logfile.py [MiB] [Latenz ms], Ausgabe als JSON-Zeilen
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    latency = int(sys.argv[2]) / 1000 if len(sys.argv) > 2 else 0.0
+    logdata = _createlog(size)
+
+    def load_applog(start, count):
+        sleep(latency)
+        if start > len(logdata):
+            return Binary(b'\x19')
+        return Binary(logdata[start:start + count])
+
+    srv = SimpleXMLRPCServer(("127.0.0.1", 0), logRequests=False)
+    srv.register_function(load_applog)
+    Thread(target=srv.serve_forever, daemon=True).start()
+    cli = ServerProxy("http://127.0.0.1:{0}".format(srv.server_address[1]))
+
+    for name, func, args in (
+            ("concat", _fetchlog_concat, (16384,)),
+            ("chunks", _fetchlog, (16384,)),
+            ("adaptive", _fetchlog, (16384, 1048576))):
+        tracemalloc.start()
+        tm_start = perf_counter()
+        text, position, ctrl = func(cli.load_applog, 0, *args)
+        tm_load = perf_counter() - tm_start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(json.dumps({
+            "method": name,
+            "logbytes": len(logdata),
+            "latency_ms": latency * 1000,
+            "complete": position == len(logdata),
+            "load_s": tm_load,
+            "peak_mib": peak / 1048576,
+        }), flush=True)
+        del text
+
+    # Nur das Ende wie beim Öffnen des Fensters laden
+    tm_start = perf_counter()
+    position = _tailposition(cli.load_applog, 262144, 16384)
+    text, position, ctrl = _fetchlog(cli.load_applog, position, 16384)
+    print(json.dumps({
+        "method": "tail",
+        "logbytes": len(logdata),
+        "latency_ms": latency * 1000,
+        "complete": position == len(logdata),
+        "load_s": perf_counter() - tm_start,
+        "tail_bytes": len(text.encode("utf-8")),
+    }), flush=True)
+
+    srv.shutdown()
+    srv.server_close()
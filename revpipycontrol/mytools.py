@@ -24,6 +24,8 @@ savefile_connections = pathjoin(
     homedir, ".revpipyplc", "connections.dat")
 savefile_developer = pathjoin(
     homedir, ".revpipyplc", "developer.dat")
+savefile_layoutcache = pathjoin(
+    homedir, ".revpipyplc", "layoutcache.dat")
 savefile_programpath = pathjoin(
     homedir, ".revpipyplc", "programpath.dat")
 
@@ -10,45 +10,587 @@ __author__ = "Sven Sager"
 __copyright__ = "Copyright (C) 2018 Sven Sager"
 __license__ = "GPLv3"
 
+import csv
+import os
 import pickle
 import tkinter
+import tkinter.filedialog as tkfd
 import tkinter.messagebox as tkmsg
+from collections import deque
+from bisect import bisect_left, bisect_right
+from hashlib import sha256
+from itertools import islice
 from mytools import gettrans
-from threading import Lock
-from xmlrpc.client import MultiCall
+from mytools import savefile_layoutcache as savefile
+from queue import Empty, Queue
+from revpirecord import ImageRecorder, ImageReplay
+from revpitrend import RevPiTrend, TrendSeries
+from struct import Struct, pack
+from threading import Event, Lock, Thread
+from time import localtime, perf_counter, strftime, time
+from xmlrpc.client import Binary, MultiCall, ServerProxy
 
 # Übersetzung laden
 _ = gettrans()
 
+# struct Formatzeichen für Byte-IOs mit Standardlänge
+_structcodes = {1: "B", 2: "H", 4: "I", 8: "Q"}
+
+# Schlüssel der angehefteten IOs in den IODecoder Dicts
+_pinkey = "pinned"
+
+
+def _decodeio(ba_values, io):
+    u"""Liest den Wert eines einzelnen IOs aus einem Prozessabbild.
+
+    @param ba_values Prozessabbild als bytearray()
+    @param io IOEntry des IOs
+    @return Wert wie bei IODecoder.decode()
+
+    """
+    if io.byte >= 0:
+        return bool(ba_values[io.byte] & io.mask)
+    int_byte = int.from_bytes(
+        ba_values[io.slc], byteorder=io.byteorder, signed=io.signed
+    )
+    return int_byte if io.bitaddr < 0 else bool(int_byte & 1 << io.bitaddr)
+
+
+def _encodeio(io, value):
+    u"""Wandelt den Wert eines Byte-IOs in seine Bytes im Prozessabbild um.
+
+    Bit-IOs teilen sich ihr Byte mit anderen IOs und werden nie als ganze
+    Bytes geschrieben.
+
+    @param io IOEntry des IOs
+    @param value Neuer Wert für das IO
+    @return <class 'bytes'> ab io.baddr oder None, wenn nicht möglich
+
+    """
+    if io.bitaddr >= 0 or io.blen == 0:
+        return None
+    try:
+        return int(value).to_bytes(
+            io.blen, byteorder=io.byteorder, signed=io.signed
+        )
+    except (OverflowError, TypeError, ValueError):
+        return None
+
+
+def _loadlayout(revpiname=None):
+    u"""Läd zwischengespeicherte piCtory Layouts.
+    @param revpiname Layout nur für RevPi laden
+    @return <class 'dict'> mit Layout"""
+    if os.path.exists(savefile):
+        try:
+            with open(savefile, "rb") as fh:
+                dict_all = pickle.load(fh)
+        except Exception:
+            dict_all = {}
+        if revpiname is None:
+            return dict_all
+        else:
+            return dict_all.get(revpiname, {})
+    return {}
+
+
+def _savelayout(revpiname, layout):
+    u"""Speichert das piCtory Layout eines RevPi zwischen.
+
+    @param revpiname Layout ist für diesen RevPi
+    @param layout <class 'dict'> mit Layout
+    @return True, bei erfolgreicher Verarbeitung
+
+    """
+    try:
+        os.makedirs(os.path.dirname(savefile), exist_ok=True)
+        if revpiname is None:
+            dict_all = layout
+        else:
+            dict_all = _loadlayout()
+            dict_all[revpiname] = layout
+        with open(savefile, "wb") as fh:
+            pickle.dump(dict_all, fh)
+    except Exception:
+        return False
+    return True
+
+
+class IOEntry():
+
+    u"""IO aus dem piCtory Layout mit vorberechneten Werten.
+
+    Wird aus den Listen von ps_inps/ps_outs erstellt, die in älteren
+    Versionen von RevPiPyLoad noch keine Byteorder und Vorzeichen haben.
+
+    """
+
+    __slots__ = "baddr", "bitaddr", "blen", "bmk", "byte", "byteorder", \
+        "device", "mask", "max", "min", "name", "rowvar", "signed", "slc", \
+        "value", "var"
+
+    def __init__(self, lst_io, device=None):
+        u"""Init IOEntry-Class.
+        @param lst_io [name,blen,baddr,bmk,bitaddr,(border,signed)]
+        @param device Deviceposition des IOs"""
+        self.device = device
+        self.name = lst_io[0]
+        self.blen = lst_io[1]
+        self.baddr = lst_io[2]
+        self.bmk = lst_io[3]
+        self.bitaddr = lst_io[4]
+        self.byteorder = "little" if len(lst_io) < 6 else lst_io[5]
+        self.signed = False if len(lst_io) < 7 else lst_io[6]
+        self.slc = slice(self.baddr, self.baddr + self.blen)
+
+        # Eigene tkinter Variable wird mit dem Steuerelement erstellt, in
+        # IO-Listen erhält das IO nur die Variable der gebundenen Zeile
+        self.rowvar = None
+        self.var = None
+
+        # Zuletzt umgewandelter oder eingegebener Wert
+        self.value = False if self.bitaddr >= 0 else 0
+
+        # Byte und Maske für Bit-IOs, -1 wenn außerhalb der Bytelänge
+        self.byte = -1
+        self.mask = 0
+        if 0 <= self.bitaddr < self.blen * 8:
+            if self.byteorder == "little":
+                self.byte = self.baddr + self.bitaddr // 8
+            else:
+                self.byte = self.baddr + self.blen - 1 - self.bitaddr // 8
+            self.mask = 1 << self.bitaddr % 8
+
+        # Wertebereich für Bytes max 22, sonst 0
+        if self.blen == 0 or self.blen > 22:
+            self.max = 0
+            self.min = 0
+        else:
+            self.max = int.from_bytes(
+                (b'\x7f' if self.signed else b'\xff') +
+                b'\xff' * (self.blen - 1),
+                byteorder="big"
+            )
+            self.min = 0 if not self.signed else int.from_bytes(
+                b'\x80' + b'\x00' * (self.blen - 1),
+                byteorder="big",
+                signed=True
+            )
+
+
+class IODecoder():
+
+    u"""Vorkompilierte Umwandlung der IOs eines Devices.
+
+    Byte-IOs mit Standardlänge werden je Byteorder in einem struct-Format
+    zusammengefasst, Bit-IOs auf Byteadresse und Bitmaske aufgelöst. Alle
+    anderen IOs werden über int.from_bytes() umgewandelt.
+
+    """
+
+    __slots__ = "lst_io", "slc", "values", "__bits", "__ints", "__structs"
+
+    def __init__(self, lst_io):
+        u"""Init IODecoder-Class.
+        @param lst_io Liste der IOEntry eines Devices"""
+        self.__bits = []
+        self.__ints = []
+        self.__structs = []
+        lst_bits = []
+        lst_ints = []
+        lst_structs = []
+        dict_std = {"little": [], "big": []}
+
+        for io in lst_io:
+            if io.byte >= 0:
+                # Bit-IO direkt über Byte und Maske abfragen
+                self.__bits.append((io.byte, io.mask))
+                lst_bits.append(io)
+            elif io.bitaddr < 0 and io.blen in _structcodes \
+                    and io.byteorder in dict_std:
+                dict_std[io.byteorder].append(io)
+            else:
+                self.__ints.append(
+                    (io.slc, io.byteorder, io.signed, io.bitaddr)
+                )
+                lst_ints.append(io)
+
+        # Formate je Byteorder aufbauen, Überlappungen einzeln umwandeln
+        for border in dict_std:
+            if not dict_std[border]:
+                continue
+            lst_std = sorted(dict_std[border], key=lambda io: io.baddr)
+            offset = lst_std[0].baddr
+            position = offset
+            fmt = "<" if border == "little" else ">"
+            for io in lst_std:
+                if io.baddr < position:
+                    self.__ints.append((io.slc, border, io.signed, -1))
+                    lst_ints.append(io)
+                    continue
+                if io.baddr > position:
+                    fmt += "{0}x".format(io.baddr - position)
+                code = _structcodes[io.blen]
+                fmt += code.lower() if io.signed else code
+                position = io.slc.stop
+                lst_structs.append(io)
+            self.__structs.append((Struct(fmt), offset))
+
+        # Reihenfolge entspricht der Rückgabe von decode()
+        self.lst_io = lst_structs + lst_bits + lst_ints
+        if len(lst_io) == 0:
+            self.slc = slice(0, 0)
+        else:
+            self.slc = slice(
+                min(io.baddr for io in lst_io),
+                max(io.slc.stop for io in lst_io)
+            )
+
+        # Zuletzt umgewandelte Werte als Vergleich für Änderungen
+        self.values = []
+
+    def decode(self, ba_values):
+        u"""Wandelt alle IOs aus dem Prozessabbild um.
+        @param ba_values Prozessabbild, mindestens slc.stop Bytes lang
+        @return list() mit Werten in Reihenfolge von lst_io"""
+        values = []
+        for st, offset in self.__structs:
+            values.extend(st.unpack_from(ba_values, offset))
+        for byte, mask in self.__bits:
+            values.append(bool(ba_values[byte] & mask))
+        for slc, border, signed, bitaddr in self.__ints:
+            int_byte = int.from_bytes(
+                ba_values[slc], byteorder=border, signed=signed
+            )
+            values.append(
+                int_byte if bitaddr < 0 else bool(int_byte & 1 << bitaddr)
+            )
+        return values
+
+
+class IOChangeLog():
+
+    u"""Erkennt Wertänderungen aller IOs zwischen zwei Prozessabbildern.
+
+    Die geänderten Bytes werden über ein XOR der ganzen Abbilder als int()
+    und eine Suche in 8-Byte-Worten gefunden. Nur IOs auf diesen Bytes
+    werden über einen Byte-Index umgewandelt und verglichen. Die Änderungen
+    liegen als (zeitstempel, device, io, alt, neu) in einem Ringpuffer mit
+    maxlen Einträgen.
+
+    """
+
+    def __init__(self, dict_inps, dict_outs, imglen, maxlen=1000):
+        u"""Init IOChangeLog class.
+
+        @param dict_inps dict() mit IOEntry Listen der Inputs je Device
+        @param dict_outs dict() mit IOEntry Listen der Outputs je Device
+        @param imglen Länge des Prozessabbilds
+        @param maxlen Maximale Anzahl gespeicherter Änderungen
+
+        """
+        self.cnt_changes = 0
+        self.events = deque(maxlen=maxlen)
+        self.imglen = imglen
+
+        self.__ba_last = None
+        self.__lk = Lock()
+
+        # Byte-Index auf die IOs, die dieses Byte belegen
+        self.__index = [() for i in range(imglen)]
+        for dict_io in (dict_inps, dict_outs):
+            for dev in dict_io:
+                for io in dict_io[dev]:
+                    rng = range(io.byte, io.byte + 1) if io.byte >= 0 \
+                        else range(io.baddr, io.slc.stop)
+                    for byte in rng:
+                        self.__index[byte] += ((dev, io),)
+
+    def clear(self):
+        u"""Löscht alle gespeicherten Änderungen."""
+        with self.__lk:
+            self.events.clear()
+
+    def feed(self, ba_values, timestamp):
+        u"""Vergleicht ein Prozessabbild mit dem vorherigen.
+
+        @param ba_values Prozessabbild als bytearray()
+        @param timestamp Zeitstempel des Abbilds
+        @return Anzahl der erkannten Änderungen
+
+        """
+        ba_values = bytes(ba_values[:self.imglen])
+        with self.__lk:
+            ba_last = self.__ba_last
+            self.__ba_last = ba_values
+        if ba_last is None or len(ba_last) != len(ba_values):
+            return 0
+
+        diff = int.from_bytes(ba_values, "little") ^ \
+            int.from_bytes(ba_last, "little")
+        if not diff:
+            return 0
+
+        # Nur 8-Byte-Worte mit Änderungen byteweise durchsuchen
+        ba_diff = diff.to_bytes(len(ba_values) + 7 & ~7, "little")
+        dict_io = {}
+        for word, value in enumerate(memoryview(ba_diff).cast("Q")):
+            if not value:
+                continue
+            for byte in range(word << 3, (word << 3) + 8):
+                if ba_diff[byte]:
+                    for dev, io in self.__index[byte]:
+                        dict_io[id(io)] = (dev, io)
+
+        lst_events = []
+        for dev, io in dict_io.values():
+            old = _decodeio(ba_last, io)
+            new = _decodeio(ba_values, io)
+            if old != new:
+                lst_events.append((timestamp, dev, io, old, new))
+
+        with self.__lk:
+            self.events.extend(lst_events)
+            self.cnt_changes += len(lst_events)
+        return len(lst_events)
+
+    def getnew(self, cnt_known):
+        u"""Gibt die Änderungen zurück, die noch nicht abgeholt wurden.
+        @param cnt_known cnt_changes beim letzten Abholen
+        @return (cnt_changes, list() der neuen Änderungen)"""
+        with self.__lk:
+            cnt_new = min(self.cnt_changes - cnt_known, len(self.events))
+            return self.cnt_changes, list(islice(
+                self.events, len(self.events) - cnt_new, None
+            ))
+
+
+class IOIndex():
+
+    u"""Suchindex über Namen und BMK der IOs aller Devices.
+
+    Präfixe werden per Binärsuche in den sortierten Schlüsseln gefunden,
+    Teilstrings über str.find() in einem Text aller Schlüssel.
+
+    """
+
+    def __init__(self, dict_inps, dict_outs):
+        u"""Init IOIndex class.
+        @param dict_inps dict() mit IOEntry Listen der Inputs je Device
+        @param dict_outs dict() mit IOEntry Listen der Outputs je Device"""
+        lst_entries = []
+        for dict_io in (dict_inps, dict_outs):
+            for dev in dict_io:
+                for io in dict_io[dev]:
+                    lst_entries.append((io.name.lower(), io))
+                    if io.bmk:
+                        lst_entries.append((io.bmk.lower(), io))
+        lst_entries.sort(key=lambda entry: entry[0])
+
+        self.lst_keys = [entry[0] for entry in lst_entries]
+        self.lst_io = [entry[1] for entry in lst_entries]
+
+        # Startposition jedes Schlüssels im gemeinsamen Text
+        self.__offsets = []
+        offset = 0
+        for key in self.lst_keys:
+            self.__offsets.append(offset)
+            offset += len(key) + 1
+        self.__text = "\n".join(self.lst_keys)
+
+    def search(self, text, maxresults=100):
+        u"""Sucht IOs, deren Name oder BMK den Text enthält.
+
+        @param text Suchtext, Groß- und Kleinschreibung wird ignoriert
+        @param maxresults Maximale Anzahl der Ergebnisse
+        @return list() der IOEntry, Treffer am Anfang zuerst
+
+        """
+        text = text.strip().lower()
+        if not text or "\n" in text:
+            return []
+
+        # Präfix über sortierte Schlüssel
+        dict_result = {}
+        i = bisect_left(self.lst_keys, text)
+        while i < len(self.lst_keys) and len(dict_result) < maxresults \
+                and self.lst_keys[i].startswith(text):
+            dict_result[id(self.lst_io[i])] = self.lst_io[i]
+            i += 1
+
+        # Teilstring, danach beim nächsten Schlüssel weitersuchen
+        pos = self.__text.find(text)
+        while pos >= 0 and len(dict_result) < maxresults:
+            i = bisect_right(self.__offsets, pos) - 1
+            dict_result.setdefault(id(self.lst_io[i]), self.lst_io[i])
+            if i + 1 >= len(self.__offsets):
+                break
+            pos = self.__text.find(text, self.__offsets[i + 1])
+
+        return list(dict_result.values())
+
 
 class RevPiCheckClient(tkinter.Frame):
 
     u"""Baut Fenstererweiterung für 'watch modus'."""
 
-    def __init__(self, master, xmlcli, xmlmode=0):
+    def __init__(self, master, xmlcli, xmlmode=0, revpi=None, xmlurl=None):
         """Instantiiert MyApp-Klasse."""
         super().__init__(master)
 
         # XML-Daten abrufen
         self.xmlmode = xmlmode
         self.cli = xmlcli
+
+        # Eigene Verbindung für den Abfragethread, da ServerProxy nur eine
+        # HTTP Verbindung hält und nicht aus mehreren Threads nutzbar ist.
+        # lk sperrt cli_values, lk_cli sperrt cli (gleich bei einer
+        # gemeinsamen Verbindung)
+        self.cli_values = xmlcli if xmlurl is None else ServerProxy(xmlurl)
+        self.lk = Lock()
+        self.lk_cli = self.lk if xmlurl is None else Lock()
+        self.revpi = revpi
         self.cli.psstart()
-        self.lst_devices = self.cli.ps_devices()
+
+        # Outputs als Bytebereiche schreiben, wenn der RevPi es unterstützt
+        try:
+            self.rawwrite = "ps_setbytes" in self.cli.system.listMethods()
+        except Exception:
+            self.rawwrite = False
+
+        # Layout aus Zwischenspeicher sofort verwenden, der Hash der piCtory
+        # Konfig wird danach mit checkpictory im Hintergrund geprüft
+        layout = {} if revpi is None else _loadlayout(revpi)
+        self.fromcache = "pictoryhash" in layout
+        if self.fromcache:
+            self.pictoryhash = layout["pictoryhash"]
+            self.lst_devices = layout["devices"]
+            self.dict_inps = layout["inps"]
+            self.dict_outs = layout["outs"]
+        else:
+            self.pictoryhash = self.getpictoryhash()
+            self.lst_devices = self.cli.ps_devices()
+            self.dict_inps = pickle.loads(self.cli.ps_inps().data)
+            self.dict_outs = pickle.loads(self.cli.ps_outs().data)
+            if revpi is not None and self.pictoryhash is not None:
+                _savelayout(revpi, {
+                    "pictoryhash": self.pictoryhash,
+                    "devices": self.lst_devices,
+                    "inps": self.dict_inps,
+                    "outs": self.dict_outs,
+                })
+
         self.dict_devices = {v[0]: v[1] for v in self.lst_devices}
         self.lst_devices = [d[0] for d in self.lst_devices]
-        self.dict_inps = pickle.loads(self.cli.ps_inps().data)
-        self.dict_outs = pickle.loads(self.cli.ps_outs().data)
+
+        # IOs mit vorberechneten Werten erstellen
+        self.dict_inps = {
+            dev: [IOEntry(io, dev) for io in self.dict_inps[dev]]
+            for dev in self.dict_inps
+        }
+        self.dict_outs = {
+            dev: [IOEntry(io, dev) for io in self.dict_outs[dev]]
+            for dev in self.dict_outs
+        }
         self.err_workvalues = 0
         self.max_errors = 25
+        self.cnt_updates = 0
+        self.tm_decode = 0.0
+
+        # Abfrageintervall der automatischen Aktualisierung in Sekunden,
+        # wird anhand der Antwortzeit (rtt) zwischen min und max angepasst
+        self.interval = 0.2
+        self.max_interval = 2.0
+        self.min_interval = 0.1
+        self.rtt = 0.0
+
+        # Leistungswerte je Durchlauf für Anzeige und CSV-Export
+        self.bytes_fetch = 0
+        self.lst_perf = deque(maxlen=10000)
+        self.tm_apply = 0.0
+        self.__tm_perf = 0.0
 
-        self.lk = Lock()
         self.dict_wins = {}
+        self.__dict_last = {}
+        self.__evt_stop = Event()
+        self.__fullrefresh = True
+        self.__qu_values = Queue()
+        self.__th_pictory = None
+        self.__th_values = None
+        self.__tmr_values = None
+
+        # Outputs im Modus 'nur Inputs' seltener umwandeln
+        self.inponly = False
+        self.out_interval = 1.0
+        self.__refreshouts = False
+
+        # Schreibzugriffe innerhalb von write_delay ms zusammenfassen
+        self.write_delay = 150
+        self.__dict_writes = {}
+        self.__tmr_writes = None
+
+        # Ohne Autorefresh geänderte Outputs für 'Write Outputs'
+        self.__dict_edits = {}
         self.__checkwrite = True
         self.__lockedvar = None
         self.__oldvalue = None
 
+        # Abgerufene Prozessabbilder aufzeichnen
+        self.recorder = None
+
+        # Wiedergabe einer Aufzeichnung statt ps_values
+        self.replay = None
+        self.replaywin = None
+        self.__ba_replay = None
+        self.__replaystart = None
+        self.__tm_replay = 0.0
+        self.__tmr_replay = None
+
         self.autorw = tkinter.BooleanVar()
         self.dowrite = tkinter.BooleanVar()
+        self.var_mininterval = tkinter.IntVar(
+            value=int(self.min_interval * 1000)
+        )
+        self.var_rate = tkinter.StringVar()
+        self.var_record = tkinter.BooleanVar()
+        self.var_replaypos = tkinter.DoubleVar()
+        self.var_replaytime = tkinter.StringVar()
+        self.var_changes = tkinter.BooleanVar()
+        self.var_search = tkinter.StringVar()
+        self.var_inponly = tkinter.BooleanVar()
+        self.var_perf = tkinter.StringVar()
+        self.var_showperf = tkinter.BooleanVar()
+
+        # Umwandlung der IOs wird mit den Devicefenstern erstellt
+        self.dict_decinps = {}
+        self.dict_decouts = {}
+        self.imglen = max([0] + [
+            io.slc.stop for dev in self.lst_devices
+            for io in self.dict_inps[dev] + self.dict_outs[dev]
+        ])
+
+        # Nur Devices mit sichtbarem Fenster werden aktualisiert
+        self.lst_active = []
+
+        # Größere IO-Gruppen erhalten nur Widgets für sichtbare Zeilen
+        self.max_iorows = 28
+
+        # Wertänderungen aller IOs für die Seitenleiste erkennen
+        self.changelog = IOChangeLog(
+            self.dict_inps, self.dict_outs, self.imglen
+        )
+        self.__cnt_changes = 0
+
+        # Suche über alle IOs und angeheftete IOs
+        self.ioindex = IOIndex(self.dict_inps, self.dict_outs)
+        self.lst_pinned = []
+        self.lst_results = []
+        self.pinactive = False
+        self.pinwin = None
+
+        # Verläufe ausgewählter IOs, Rechtsklick auf den IO-Namen
+        self.dict_trends = {}
+        self.trendwin = None
 
         # Fenster aufbauen
         self._createwidgets()
@@ -56,25 +598,45 @@ class RevPiCheckClient(tkinter.Frame):
         # Aktuelle Werte einlesen
         self.refreshvalues()
 
-    def __chval(self, device, io, event=None):
-        u"""Schreibt neuen Output Wert auf den RevPi."""
+    def __chval(self, device, io, tkvar, event=None):
+        u"""Merkt neuen Output Wert zum Schreiben auf den RevPi vor."""
+        io.value = tkvar.get()
+
+        # Weitere Steuerelemente des IOs angleichen
+        for var in (io.var, io.rowvar):
+            if var is not None and var is not tkvar:
+                var.set(io.value)
+
         if self.dowrite.get() and self._warnwrite():
-            with self.lk:
-                self.validatereturn(
-                    self.cli.ps_setvalue(device, io[0], io[5].get())
+            # Neu einlesen erst nach dem Schreiben in _flushwrites
+            self.__dict_writes[(device, io.name)] = (device, io)
+            if self.__tmr_writes is None:
+                self.__tmr_writes = self.master.after(
+                    self.write_delay, self._flushwrites
                 )
-
-            # Alles neu einlesen wenn nicht AutoRW aktiv ist
+        else:
             if not self.autorw.get():
-                self.refreshvalues()
+                self.__dict_edits[(device, io.name)] = (device, io)
 
+            # Nicht geschriebenen Wert beim nächsten Durchlauf zurücksetzen
+            self.__fullrefresh = True
         self.__lockedvar = None
 
-    def __hidewin(self, win, event=None):
-        u"""Verbergt übergebenes Fenster.
-        @param win Fenster zum verbergen
+    def __hidewin(self, dev, event=None):
+        u"""Verbergt Fenster eines Devices.
+        @param dev Device, dessen Fenster verborgen wird
         @param event Tkinter Event"""
-        win.withdraw()
+        self.dict_wins[dev].withdraw()
+        self.lst_active = [d for d in self.lst_active if d != dev]
+
+    def __pausereplay(self):
+        u"""Hält die Wiedergabe an der aktuellen Position an."""
+        if self.__tmr_replay is not None:
+            self.master.after_cancel(self.__tmr_replay)
+            self.__tmr_replay = None
+        self.__replaystart = None
+        if self.replaywin is not None:
+            self.btn_replayplay["text"] = _("Play")
 
     def __saveoldvalue(self, event, tkvar):
         u"""Speichert bei Keypress aktuellen Wert für wiederherstellung."""
@@ -85,29 +647,51 @@ class RevPiCheckClient(tkinter.Frame):
             except Exception:
                 pass
 
-    def __showwin(self, win):
-        u"""Zeigt oder verbergt übergebenes Fenster.
-        @param win Fenster zum anzeigen/verbergen"""
-        if win.winfo_viewable():
-            win.withdraw()
+    def __showwin(self, dev):
+        u"""Zeigt oder verbergt Fenster eines Devices.
+
+        Das Fenster wird beim ersten Anzeigen erstellt.
+
+        @param dev Device, dessen Fenster angezeigt/verborgen wird
+
+        """
+        if dev not in self.dict_wins:
+            self._createdevwin(dev)
+        elif self.dict_wins[dev].winfo_viewable():
+            self.__hidewin(dev)
+            return None
+
+        self.dict_wins[dev].deiconify()
+        if dev not in self.lst_active:
+            self.lst_active = [
+                d for d in self.lst_devices if d == dev or d in self.lst_active
+            ]
+
+        # Werte des Fensters aktualisieren
+        if self.autorw.get():
+            self.__fullrefresh = True
         else:
-            win.deiconify()
+            self._workvalues(devices=[dev])
 
-    def __spinboxkey(self, device, io, event=None):
+    def __spinboxkey(self, device, io, tkvar, event=None):
         u"""Prüft die Eingabe auf plausibilität.
         @param event tkinter Event
-        @param io IO Liste mit tkinter Variable"""
-        # io = [name,bytelen,byteaddr,bmk,bitaddress,(tkinter_var)]
+        @param io IOEntry des IOs
+        @param tkvar tkinter Variable der Spinbox"""
+        # Nur über die Tastatur eingegebene Werte übernehmen
+        if self.__lockedvar is not tkvar:
+            return None
+
         try:
-            newvalue = io[5].get()
+            newvalue = tkvar.get()
             # Wertebereich prüfen
-            if not self.minint(io) <= newvalue <= self.maxint(io):
+            if not io.min <= newvalue <= io.max:
                 raise ValueError("value not valid")
 
-            self.__chval(device, io)
+            self.__chval(device, io, tkvar)
 
         except Exception:
-            io[5].set(self.__oldvalue)
+            tkvar.set(self.__oldvalue)
             tkmsg.showerror(
                 _("Error"),
                 _("Given value for Output '{0}' is not valid! \n"
@@ -119,7 +703,118 @@ class RevPiCheckClient(tkinter.Frame):
             )
 
             # Focus zurücksetzen
-            event.widget.focus_set()
+            if event is not None:
+                event.widget.focus_set()
+
+    def _applyvalues(self, lst_changes, perf=None):
+        u"""Übernimmt umgewandelte Werte in die tkinter Variablen.
+
+        @param lst_changes list() mit (device, io, value) von _decodevalues
+        @param perf (rtt, bytes, decodezeit) des Abrufs der Werte, sonst
+            die zuletzt im tkinter Thread gemessenen Werte
+
+        """
+        tm_start = perf_counter()
+        self.cnt_updates = 0
+        for dev, io, value in lst_changes:
+            # Gesperrte Variable und noch zu schreibende IOs überspringen
+            if self.__lockedvar is not None and (
+                    io.var is self.__lockedvar or
+                    io.rowvar is self.__lockedvar):
+                continue
+            if (dev, io.name) in self.__dict_writes:
+                continue
+
+            # Eingelesener Wert ersetzt eine nicht geschriebene Eingabe
+            self.__dict_edits.pop((dev, io.name), None)
+
+            # Nur Variablen angezeigter Steuerelemente setzen
+            io.value = value
+            if io.var is not None:
+                io.var.set(value)
+                self.cnt_updates += 1
+            if io.rowvar is not None:
+                io.rowvar.set(value)
+                self.cnt_updates += 1
+
+        if self.var_changes.get():
+            self._showchanges()
+
+        # Leistungswerte dieses Durchlaufs merken
+        self.tm_apply = perf_counter() - tm_start
+        if perf is None:
+            perf = (self.rtt, self.bytes_fetch, self.tm_decode)
+        self.lst_perf.append(
+            (time(),) + perf + (self.tm_apply, self.cnt_updates)
+        )
+        if self.var_showperf.get() and tm_start - self.__tm_perf >= 0.5:
+            self.__tm_perf = tm_start
+            self._showperf()
+
+    def _bindiorow(self, iolist, row, io):
+        u"""Bindet eine Zeile einer IO-Liste an ein IO.
+
+        @param iolist dict() der IO-Liste von _createiolist
+        @param row Zeile als [label, checkbutton, spinbox, io, boolvar,
+            intvar]
+        @param io IOEntry des IOs
+
+        """
+        if row[3] is io:
+            return None
+        if row[3] is not None:
+            row[3].rowvar = None
+        row[3] = io
+        lbl, check, txt = row[:3]
+
+        lbl["text"] = io.name
+        if io.bitaddr >= 0:
+            txt.grid_remove()
+            check["state"] = "disabled" if iolist["iotype"] == "inp" \
+                else "normal"
+            check.grid()
+            io.rowvar = row[4]
+        else:
+            check.grid_remove()
+            txt.configure(from_=io.min, to=io.max)
+            txt["state"] = "disabled" if iolist["iotype"] == "inp" or \
+                io.max == 0 else "normal"
+            width = len(str(io.max)) + 1
+            txt["width"] = 7 if width > 7 else width
+            txt.grid()
+            io.rowvar = row[5]
+
+        # Aktuellen Wert des IOs in die Zeile übernehmen
+        io.rowvar.set(io.value)
+
+    def _createdevwin(self, dev):
+        u"""Erstellt das Fenster eines Devices mit allen IOs.
+        @param dev Deviceposition"""
+        win = tkinter.Toplevel(self)
+        win.wm_title("{0} | {1}".format(dev, self.dict_devices[dev]))
+        win.protocol(
+            "WM_DELETE_WINDOW",
+            lambda dev=dev: self.__hidewin(dev)
+        )
+        win.withdraw()
+        self.dict_wins[dev] = win
+
+        # Devicegruppe erstellen
+        group = tkinter.LabelFrame(win)
+        group["text"] = self.dict_devices[dev]
+        group.pack(side="left", fill="both", expand=True)
+
+        for iotype in ["inp", "out"]:
+            frame = tkinter.Frame(group)
+            frame.pack(side="left", fill="both", expand=True)
+            self._createiogroup(dev, frame, iotype)
+
+        # Geometrie einmalig nach Erstellung aller Zeilen berechnen
+        win.update_idletasks()
+
+        # Umwandlung der IOs vorbereiten (nach Erstellung der Variablen)
+        self.dict_decinps[dev] = IODecoder(self.dict_inps[dev])
+        self.dict_decouts[dev] = IODecoder(self.dict_outs[dev])
 
     def _createiogroup(self, device, frame, iotype):
         u"""Erstellt IO-Gruppen.
@@ -135,6 +830,10 @@ class RevPiCheckClient(tkinter.Frame):
         else:
             lst_io = self.dict_outs[device]
 
+        if len(lst_io) > self.max_iorows:
+            self._createiolist(device, frame, iotype, lst_io)
+            return None
+
         # Fensterinhalt aufbauen
         calc_heigh = len(lst_io) * 21
         canvas = tkinter.Canvas(
@@ -167,53 +866,230 @@ class RevPiCheckClient(tkinter.Frame):
         )
 
         # IOs generieren
-        rowcount = 0
-        for io in lst_io:
-            # io = [name,blen,baddr,bmk,bitaddr,(tkinter_var),border,signed]
+        for rowcount, io in enumerate(lst_io):
+            self._createiorow(s_frame, device, io, iotype, rowcount)
+
+    def _createiolist(self, device, frame, iotype, lst_io):
+        u"""Erstellt eine IO-Gruppe mit wiederverwendeten Zeilen.
 
-            tkinter.Label(s_frame, text=io[0]).grid(
-                column=1, row=rowcount, sticky="w"
+        Es werden nur max_iorows Zeilen erstellt, die beim Scrollen an die
+        IOs des neuen Ausschnitts gebunden werden. Nur die Zeilen haben
+        tkinter Variablen, die Werte aller IOs bleiben im IOEntry.
+
+        @param device Deviceposition
+        @param frame tkinter Frame
+        @param iotype 'inp' oder 'out' als str()
+        @param lst_io Liste der IOs
+
+        """
+        s_frame = tkinter.Frame(frame, width=190)
+        s_frame.columnconfigure(1, weight=1)
+        iolist = {
+            "device": device,
+            "first": 0,
+            "frame": s_frame,
+            "iotype": iotype,
+            "lst_io": lst_io,
+            "rows": [],
+        }
+        vsb = tkinter.Scrollbar(
+            frame, orient="vertical",
+            command=lambda *args: self._scrolliolist(iolist, *args)
+        )
+        iolist["vsb"] = vsb
+
+        vsb.pack(side="right", fill="y")
+        s_frame.pack(side="left", fill="both", expand=True)
+
+        # Zeilen mit allen möglichen Widgets erzeugen
+        for rowcount in range(self.max_iorows):
+            lbl = tkinter.Label(s_frame)
+            lbl.grid(column=1, row=rowcount, sticky="w")
+            boolvar = tkinter.BooleanVar()
+            check = tkinter.Checkbutton(s_frame)
+            check["text"] = ""
+            check["variable"] = boolvar
+            check.grid(column=0, row=rowcount)
+            check.grid_remove()
+            intvar = tkinter.IntVar()
+            txt = tkinter.Spinbox(s_frame)
+            txt["textvariable"] = intvar
+            txt.grid(column=0, row=rowcount)
+            txt.grid_remove()
+
+            row = [lbl, check, txt, None, boolvar, intvar]
+            lbl.bind(
+                "<ButtonPress-3>",
+                lambda event, device=device, row=row:
+                self.toggletrend(device, row[3])
+            )
+            check["command"] = lambda device=device, row=row: \
+                self.__chval(device, row[3], row[4])
+            txt["command"] = lambda device=device, row=row: \
+                self.__chval(device, row[3], row[5])
+            txt.bind(
+                "<Key>",
+                lambda event, row=row: self.__saveoldvalue(event, row[5])
             )
+            txt.bind(
+                "<FocusOut>",
+                lambda event, device=device, row=row:
+                self.__spinboxkey(device, row[3], row[5], event)
+            )
+            iolist["rows"].append(row)
 
-            if io[4] >= 0:
-                var = tkinter.BooleanVar()
-                check = tkinter.Checkbutton(s_frame)
-                check["command"] = \
-                    lambda device=device, io=io: self.__chval(device, io)
-                check["state"] = "disabled" if iotype == "inp" else "normal"
-                check["text"] = ""
-                check["variable"] = var
-                check.grid(column=0, row=rowcount)
-            else:
-                var = tkinter.IntVar()
-                txt = tkinter.Spinbox(
-                    s_frame,
-                    from_=self.minint(io),
-                    to=self.maxint(io),
-                )
-                txt.bind(
-                    "<Key>",
-                    lambda event, tkvar=var: self.__saveoldvalue(event, tkvar)
-                )
-                txt.bind(
-                    "<FocusOut>",
-                    lambda event, device=device, io=io:
-                    self.__spinboxkey(device, io, event)
-                )
-                txt["command"] = \
-                    lambda device=device, io=io: self.__chval(device, io)
-                txt["state"] = "disabled" if iotype == "inp" or \
-                    self.maxint(io) == 0 else "normal"
-                width = len(str(self.maxint(io))) + 1
-                txt["width"] = 7 if width > 7 else width
-                txt["textvariable"] = var
-                txt.grid(column=0, row=rowcount)
+        # Scrollrad Linux
+        lst_widgets = [s_frame]
+        for row in iolist["rows"]:
+            lst_widgets.extend(row[:3])
+        for widget in lst_widgets:
+            widget.bind(
+                "<ButtonPress-4>",
+                lambda x: self._scrolliolist(iolist, "scroll", -1, "units")
+            )
+            widget.bind(
+                "<ButtonPress-5>",
+                lambda x: self._scrolliolist(iolist, "scroll", 1, "units")
+            )
+
+        self._scrolliolist(iolist, "moveto", 0)
+
+    def _createiorow(self, frame, device, io, iotype, row):
+        u"""Erstellt Name und Steuerelement eines IOs in einer Zeile.
+
+        Hat das IO schon eine tkinter Variable, z.B. aus der Ansicht der
+        angehefteten IOs, wird diese weiter verwendet.
+
+        @param frame tkinter Frame mit grid Layout
+        @param device Deviceposition
+        @param io IOEntry des IOs
+        @param iotype 'inp' oder 'out' als str()
+        @param row Zeile im grid
+
+        """
+        lbl = tkinter.Label(frame, text=io.name)
+        lbl.bind(
+            "<ButtonPress-3>",
+            lambda event, device=device, io=io:
+            self.toggletrend(device, io)
+        )
+        lbl.grid(column=1, row=row, sticky="w")
+
+        if io.bitaddr >= 0:
+            var = tkinter.BooleanVar() if io.var is None else io.var
+            check = tkinter.Checkbutton(frame)
+            check["command"] = lambda device=device, io=io, tkvar=var: \
+                self.__chval(device, io, tkvar)
+            check["state"] = "disabled" if iotype == "inp" else "normal"
+            check["text"] = ""
+            check["variable"] = var
+            check.grid(column=0, row=row)
+        else:
+            var = tkinter.IntVar() if io.var is None else io.var
+            txt = tkinter.Spinbox(
+                frame,
+                from_=io.min,
+                to=io.max,
+            )
+            txt.bind(
+                "<Key>",
+                lambda event, tkvar=var: self.__saveoldvalue(event, tkvar)
+            )
+            txt.bind(
+                "<FocusOut>",
+                lambda event, device=device, io=io, tkvar=var:
+                self.__spinboxkey(device, io, tkvar, event)
+            )
+            txt["command"] = lambda device=device, io=io, tkvar=var: \
+                self.__chval(device, io, tkvar)
+            txt["state"] = "disabled" if iotype == "inp" or \
+                io.max == 0 else "normal"
+            width = len(str(io.max)) + 1
+            txt["width"] = 7 if width > 7 else width
+            txt["textvariable"] = var
+            txt.grid(column=0, row=row)
 
-            # Steuerelementvariable in IO übernehmen (mutabel)
-            io.insert(5, var)
+        # Steuerelementvariable in IO übernehmen
+        io.var = var
+        var.set(io.value)
 
-            rowcount += 1
-            s_frame.update()
+    def _createpinwin(self):
+        u"""Erstellt das Fenster der angehefteten IOs neu.
+
+        Für diese IOs wird ein eigener IODecoder erstellt, sodass nur sie
+        umgewandelt werden, solange keine Devicefenster offen sind.
+
+        """
+        if self.pinwin is None:
+            self.pinwin = tkinter.Toplevel(self)
+            self.pinwin.wm_title(_("Pinned IOs"))
+            self.pinwin.protocol("WM_DELETE_WINDOW", self.hidepinwin)
+        for widget in self.pinwin.winfo_children():
+            widget.destroy()
+
+        frame = tkinter.Frame(self.pinwin)
+        frame.columnconfigure(1, weight=1)
+        frame.pack(fill="both", expand=True, padx=5, pady=5)
+
+        lst_inps = []
+        lst_outs = []
+        for row, io in enumerate(self.lst_pinned):
+            if io in self.dict_inps[io.device]:
+                iotype = "inp"
+                lst_inps.append(io)
+            else:
+                iotype = "out"
+                lst_outs.append(io)
+            self._createiorow(frame, io.device, io, iotype, row)
+
+            lbl = tkinter.Label(frame)
+            lbl["text"] = self.dict_devices[io.device]
+            lbl.grid(column=2, row=row, sticky="w", padx=5)
+
+            btn = tkinter.Button(frame)
+            btn["command"] = lambda io=io: self.unpinio(io)
+            btn["text"] = "X"
+            btn.grid(column=3, row=row)
+
+        self.dict_decinps[_pinkey] = IODecoder(lst_inps)
+        self.dict_decouts[_pinkey] = IODecoder(lst_outs)
+
+    def _createreplaywin(self):
+        u"""Erstellt das Fenster mit der Steuerung der Wiedergabe."""
+        self.replaywin = tkinter.Toplevel(self)
+        self.replaywin.wm_title("{0} | {1}".format(
+            _("Replay"), os.path.basename(self.replay.filename)
+        ))
+        self.replaywin.protocol("WM_DELETE_WINDOW", self.closereplay)
+        self.replaywin.resizable(True, False)
+
+        frame = tkinter.Frame(self.replaywin)
+        frame.pack(fill="x")
+
+        self.btn_replayplay = tkinter.Button(frame)
+        self.btn_replayplay["text"] = _("Play")
+        self.btn_replayplay["command"] = self.playreplay
+        self.btn_replayplay.pack(side="left")
+
+        btn = tkinter.Button(frame)
+        btn["text"] = _("Step")
+        btn["command"] = self.stepreplay
+        btn.pack(side="left")
+
+        lbl = tkinter.Label(frame)
+        lbl["textvariable"] = self.var_replaytime
+        lbl.pack(side="left", padx=5)
+
+        # Schieberegler in Sekunden ab Beginn der Aufzeichnung
+        scl = tkinter.Scale(self.replaywin, orient="horizontal")
+        scl["command"] = self.scrubreplay
+        scl["from_"] = 0
+        scl["length"] = 400
+        scl["resolution"] = 0.1
+        scl["showvalue"] = False
+        scl["to"] = self.replay.tm_end - self.replay.tm_start
+        scl["variable"] = self.var_replaypos
+        scl.pack(fill="x", padx=5, pady=5)
 
     def _createwidgets(self):
         """Erstellt den Fensterinhalt."""
@@ -224,32 +1100,29 @@ class RevPiCheckClient(tkinter.Frame):
         devgrp.pack(expand=True, fill="both", side="left")
 
         for dev in self.lst_devices:
-            win = tkinter.Toplevel(self)
-            win.wm_title("{0} | {1}".format(dev, self.dict_devices[dev]))
-            win.protocol(
-                "WM_DELETE_WINDOW",
-                lambda win=win: self.__hidewin(win)
-            )
-            win.withdraw()
-            self.dict_wins[dev] = win
-
-            # Devicegruppe erstellen
-            group = tkinter.LabelFrame(win)
-            group["text"] = self.dict_devices[dev]
-            group.pack(side="left", fill="both", expand=True)
-
-            for iotype in ["inp", "out"]:
-                frame = tkinter.Frame(group)
-                frame.pack(side="left", fill="both", expand=True)
-                frame.update()
-                self._createiogroup(dev, frame, iotype)
-
             # Button erstellen
             btn = tkinter.Button(devgrp)
-            btn["command"] = lambda win=win: self.__showwin(win)
+            btn["command"] = lambda dev=dev: self.__showwin(dev)
             btn["text"] = "{0} | {1}".format(dev, self.dict_devices[dev])
             btn.pack(**cfxpxy53)
 
+        # Suche über Namen und BMK aller IOs
+        schgrp = tkinter.LabelFrame(self)
+        schgrp["text"] = _("Search IOs")
+        schgrp.pack(expand=True, fill="both", side="left")
+
+        txt = tkinter.Entry(schgrp)
+        txt["textvariable"] = self.var_search
+        txt.bind("<KeyRelease>", self._searchio)
+        txt.pack(**cfxpxy53)
+
+        self.lst_search = tkinter.Listbox(schgrp)
+        self.lst_search["height"] = 10
+        self.lst_search["width"] = 30
+        self.lst_search.bind("<Double-Button-1>", self._pinresult)
+        self.lst_search.bind("<Return>", self._pinresult)
+        self.lst_search.pack(expand=True, **cfxpxy53)
+
         # Steuerungsfunktionen
         cntgrp = tkinter.LabelFrame(self)
         cntgrp["text"] = _("Control")
@@ -286,11 +1159,396 @@ class RevPiCheckClient(tkinter.Frame):
         self.chk_dowrite["variable"] = self.dowrite
         self.chk_dowrite.pack(anchor="w")
 
+        chk = tkinter.Checkbutton(cntgrp)
+        chk["command"] = self.toggleinponly
+        chk["text"] = _("Refresh outputs every second only")
+        chk["variable"] = self.var_inponly
+        chk.pack(anchor="w")
+
+        chk = tkinter.Checkbutton(cntgrp)
+        chk["command"] = self.togglerecord
+        chk["text"] = _("Record values to file")
+        chk["variable"] = self.var_record
+        chk.pack(anchor="w")
+
+        self.btn_replay = tkinter.Button(cntgrp)
+        self.btn_replay["text"] = _("Replay recording...")
+        self.btn_replay["command"] = self.openreplay
+        self.btn_replay.pack(**cfxpxy53)
+
+        chk = tkinter.Checkbutton(cntgrp)
+        chk["command"] = self.togglechanges
+        chk["text"] = _("Show changes")
+        chk["variable"] = self.var_changes
+        chk.pack(anchor="w")
+
+        # Abfragerate
+        frame = tkinter.Frame(cntgrp)
+        frame.pack(anchor="w")
+        lbl = tkinter.Label(frame)
+        lbl["text"] = _("Min. interval (ms)")
+        lbl.pack(side="left")
+        txt = tkinter.Spinbox(
+            frame, from_=50, to=1000, increment=50, width=5, state="readonly"
+        )
+        txt["command"] = self.setmininterval
+        txt["textvariable"] = self.var_mininterval
+        txt.pack(side="left")
+
+        lbl = tkinter.Label(cntgrp)
+        lbl["textvariable"] = self.var_rate
+        lbl.pack(anchor="w")
+
+        chk = tkinter.Checkbutton(cntgrp)
+        chk["command"] = self.toggleperf
+        chk["text"] = _("Show performance")
+        chk["variable"] = self.var_showperf
+        chk.pack(anchor="w")
+
+        # Leistungswerte, über toggleperf angezeigt
+        self.frm_perf = tkinter.Frame(cntgrp)
+        lbl = tkinter.Label(self.frm_perf)
+        lbl["font"] = "TkFixedFont"
+        lbl["justify"] = "left"
+        lbl["textvariable"] = self.var_perf
+        lbl.pack(anchor="w")
+        btn = tkinter.Button(self.frm_perf)
+        btn["command"] = self.saveperf
+        btn["text"] = _("Save as CSV...")
+        btn.pack(**cfxpxy53)
+
+        # Seitenleiste mit Wertänderungen, über togglechanges angezeigt
+        self.chggrp = tkinter.LabelFrame(self)
+        self.chggrp["text"] = _("Changes")
+
+        btn = tkinter.Button(self.chggrp)
+        btn["command"] = self.clearchanges
+        btn["text"] = _("Clear")
+        btn.pack(side="bottom", fill="x", padx=5, pady=5)
+
+        sb = tkinter.Scrollbar(self.chggrp)
+        sb.pack(side="right", fill="y")
+        self.lst_changes = tkinter.Listbox(self.chggrp)
+        self.lst_changes["font"] = "TkFixedFont"
+        self.lst_changes["height"] = 15
+        self.lst_changes["width"] = 50
+        self.lst_changes["yscrollcommand"] = sb.set
+        self.lst_changes.pack(side="left", fill="both", expand=True)
+        sb["command"] = self.lst_changes.yview
+
+    def _decodevalues(
+            self, ba_values, io_dicts=None, delta=False, devices=None):
+        u"""Wandelt das Prozessabbild in IO-Werte um.
+
+        Im delta-Modus wird das Prozessabbild mit dem vorherigen verglichen
+        und es werden nur IOs verarbeitet, deren Bytes sich geändert haben.
+        Von diesen werden nur Werte zurückgegeben, die sich geändert haben.
+
+        Wird auch im Abfragethread aufgerufen und darf deshalb keine
+        tkinter Objekte verwenden.
+
+        @param ba_values Prozessabbild als bytearray()
+        @param io_dicts Arbeit nur für diese IODecoder Dicts
+        @param delta Nur geänderte Bytes verarbeiten
+        @param devices Arbeit nur für diese Devices, sonst lst_active
+        @return list() mit (device, io, value) der zu setzenden Werte
+
+        """
+        # Abfragelisten vorbereiten
+        if io_dicts is None:
+            io_dicts = [self.dict_decinps, self.dict_decouts]
+        if devices is None:
+            devices = self.lst_active
+            if self.pinactive:
+                devices = devices + [_pinkey]
+
+        # Vergleichsabbilder getrennt für Inputs und Outputs führen
+        if delta and self.__fullrefresh:
+            self.__fullrefresh = False
+            self.__dict_last = {}
+
+        # Alle Werte in einem Durchlauf umwandeln
+        tm_start = perf_counter()
+        lst_changes = []
+        for dict_dec in io_dicts:
+            iotype = "inp" if dict_dec is self.dict_decinps else "out"
+            ba_last = self.__dict_last.get(iotype) if delta else None
+            if delta:
+                self.__dict_last[iotype] = ba_values
+            else:
+                self.__dict_last.pop(iotype, None)
+
+            for dev in devices:
+                dec = dict_dec[dev]
+
+                # Unveränderte Bytes überspringen
+                if ba_last is not None and \
+                        ba_values[dec.slc] == ba_last[dec.slc]:
+                    continue
+
+                lst_values = dec.decode(ba_values)
+                lst_last = dec.values if ba_last is not None else []
+                dec.values = lst_values
+
+                if len(lst_last) == len(lst_values):
+                    # Nur geänderte Werte übernehmen
+                    lst_changes.extend(
+                        (io.device, io, value) for io, value, last in
+                        zip(dec.lst_io, lst_values, lst_last)
+                        if value != last
+                    )
+                else:
+                    lst_changes.extend(
+                        (io.device, io, value) for io, value in
+                        zip(dec.lst_io, lst_values)
+                    )
+        self.tm_decode = perf_counter() - tm_start
+
+        return lst_changes
+
+    def _fetchvalues(self):
+        u"""Ruft das Prozessabbild vom RevPi ab.
+
+        Während einer Wiedergabe wird das aktuelle Abbild der Aufzeichnung
+        zurückgegeben und nicht erneut aufgezeichnet.
+
+        @return bytearray() mit Prozessabbild oder None bei Fehler
+
+        """
+        if self.replay is not None:
+            ba_values = bytearray(self.__ba_replay)
+        else:
+            with self.lk:
+                tm_start = perf_counter()
+                try:
+                    ba_values = bytearray(self.cli_values.ps_values().data)
+                    self.bytes_fetch = len(ba_values)
+                except Exception:
+                    return None
+                finally:
+                    self.rtt = perf_counter() - tm_start
+
+            # Lokale Kopie, da togglerecord im tkinter Thread umschaltet
+            recorder = self.recorder
+            if recorder is not None:
+                recorder.write(ba_values)
+
+        # Zu kurzes Prozessabbild wie bisher mit 0 auffüllen
+        if len(ba_values) < self.imglen:
+            ba_values.extend(bytes(self.imglen - len(ba_values)))
+
+        if self.replay is None:
+            timestamp = time()
+            self.changelog.feed(ba_values, timestamp)
+
+            # Kopie der Liste, tkinter Thread könnte Verläufe ändern
+            for series in list(self.dict_trends.values()):
+                series.append(timestamp, _decodeio(ba_values, series.io))
+
+        return ba_values
+
+    def _flushwrites(self):
+        u"""Schreibt alle vorgemerkten Outputs per Multicall auf den RevPi.
+
+        Es wird der zuletzt eingegebene Wert geschrieben, auch wenn ein IO
+        mehrfach geändert wurde.
+
+        """
+        self.__tmr_writes = None
+        if not self.__dict_writes:
+            return None
+
+        xmlmc = MultiCall(self.cli)
+        for device, io in self.__dict_writes.values():
+            xmlmc.ps_setvalue(device, io.name, io.value)
+        self.__dict_writes = {}
+
+        with self.lk_cli:
+            self.validatereturn(xmlmc())
+
+        # Geschriebene Outputs beim nächsten Durchlauf anzeigen
+        self.__fullrefresh = True
+        self.__refreshouts = True
+
+        # Alles neu einlesen wenn nicht AutoRW aktiv ist
+        if not self.autorw.get():
+            self.refreshvalues()
+
     def _onfrmconf(self, canvas):
         u"""Erstellt Fenster in einem Canvas.
         @param canvas Canvas in dem Objekte erstellt werden sollen"""
         canvas.configure(scrollregion=canvas.bbox("all"))
 
+    def _pinresult(self, event=None):
+        u"""Heftet das ausgewählte Suchergebnis an.
+        @param event tkinter Event"""
+        for index in self.lst_search.curselection():
+            self.pinio(self.lst_results[int(index)])
+
+    def _scrolliolist(self, iolist, *args):
+        u"""Verschiebt den Ausschnitt einer IO-Liste.
+
+        @param iolist dict() der IO-Liste von _createiolist
+        @param args Scrollbar Befehl ('moveto', x) oder ('scroll', n, what)
+
+        """
+        count = len(iolist["lst_io"])
+        rows = len(iolist["rows"])
+        if args[0] == "moveto":
+            first = int(round(float(args[1]) * count))
+        else:
+            first = iolist["first"] + int(args[1]) * (
+                rows if args[2] == "pages" else 1
+            )
+        first = max(0, min(first, count - rows))
+
+        # Offene Eingabe direkt abschließen, bevor die Zeile neu gebunden
+        # wird, ungültige Werte wurden dabei zurückgesetzt
+        for row in iolist["rows"]:
+            if row[3] is not None and row[5] is self.__lockedvar:
+                self.__spinboxkey(iolist["device"], row[3], row[5])
+                self.__lockedvar = None
+
+        iolist["first"] = first
+        for i in range(rows):
+            self._bindiorow(
+                iolist, iolist["rows"][i], iolist["lst_io"][first + i]
+            )
+        iolist["vsb"].set(first / count, (first + rows) / count)
+
+    def _searchio(self, event=None):
+        u"""Zeigt die Suchergebnisse zum eingegebenen Text.
+        @param event tkinter Event"""
+        self.lst_results = self.ioindex.search(self.var_search.get())
+        self.lst_search.delete(0, "end")
+        for io in self.lst_results:
+            self.lst_search.insert("end", "{0} | {1}{2}".format(
+                io.name, self.dict_devices[io.device],
+                " ({0})".format(io.bmk) if io.bmk else ""
+            ))
+
+    def _showchanges(self):
+        u"""Hängt neue Wertänderungen an die Seitenleiste an."""
+        self.__cnt_changes, lst_events = \
+            self.changelog.getnew(self.__cnt_changes)
+        if not lst_events:
+            return None
+
+        for timestamp, dev, io, old, new in lst_events:
+            self.lst_changes.insert(
+                "end", "{0}.{1:03d} {2}: {3} -> {4}".format(
+                    strftime("%H:%M:%S", localtime(timestamp)),
+                    int(timestamp % 1 * 1000), io.name, old, new
+                )
+            )
+
+        # Nur so viele Zeilen wie der Ringpuffer behalten
+        overflow = self.lst_changes.size() - self.changelog.events.maxlen
+        if overflow > 0:
+            self.lst_changes.delete(0, overflow - 1)
+        self.lst_changes.see("end")
+
+    def _showperf(self):
+        u"""Zeigt die gemittelten Leistungswerte der letzten Sekunde an."""
+        if not self.lst_perf:
+            return None
+
+        tm_now = self.lst_perf[-1][0]
+        lst_last = []
+        for entry in reversed(self.lst_perf):
+            if tm_now - entry[0] > 1.0:
+                break
+            lst_last.append(entry)
+        cnt = len(lst_last)
+        tm_span = tm_now - lst_last[-1][0]
+
+        self.var_perf.set(_(
+            "Fetch: {0:.1f} ms, {1} bytes\n"
+            "Decode: {2:.2f} ms\n"
+            "Tk update: {3:.2f} ms, {4:.0f} widgets\n"
+            "Achieved: {5:.1f} Hz"
+        ).format(
+            sum(e[1] for e in lst_last) / cnt * 1000,
+            lst_last[0][2],
+            sum(e[3] for e in lst_last) / cnt * 1000,
+            sum(e[4] for e in lst_last) / cnt * 1000,
+            sum(e[5] for e in lst_last) / cnt,
+            (cnt - 1) / tm_span if tm_span > 0 else 0.0
+        ))
+
+    def _showreplay(self, timestamp, ba_image):
+        u"""Zeigt ein Abbild der Aufzeichnung in den Devicefenstern an.
+        @param timestamp Zeitstempel des Abbilds
+        @param ba_image Prozessabbild als bytearray()"""
+        self.__ba_replay = ba_image
+        self.__tm_replay = timestamp - self.replay.tm_start
+        self.var_replaypos.set(self.__tm_replay)
+        self.var_replaytime.set("{0} ({1:.1f} s)".format(
+            strftime("%Y-%m-%d %H:%M:%S", localtime(timestamp)),
+            self.__tm_replay
+        ))
+
+        # Gleicher Weg wie beim Autorefresh, nur geänderte IOs setzen
+        self._applyvalues(
+            self._decodevalues(self._fetchvalues(), delta=True)
+        )
+
+    def _thworkvalues(self, evt_stop, qu_values):
+        u"""Ruft im Thread zyklisch das Prozessabbild ab.
+
+        Die umgewandelten Werte werden mit den Leistungswerten dieses
+        Durchlaufs über die Queue an tmr_workvalues im tkinter Thread
+        übergeben, None steht für einen Fehler.
+
+        Das Intervall wird aus der gemittelten Antwortzeit berechnet, damit
+        die Abfragen höchstens ein Viertel der Zeit belegen. Bei Fehlern
+        wird das maximale Intervall verwendet.
+
+        Ist inponly gesetzt, werden Outputs nur alle out_interval Sekunden
+        und direkt nach dem Schreiben umgewandelt.
+
+        @param evt_stop Event zum Beenden des Threads
+        @param qu_values Queue für die Ergebnisse
+
+        """
+        rtt_avg = None
+        tm_outs = 0.0
+        while not evt_stop.is_set():
+            tm_start = perf_counter()
+
+            ba_values = self._fetchvalues()
+            if ba_values is None:
+                qu_values.put(None)
+                self.interval = self.max_interval
+            else:
+                # Sofort merken, Attribute werden beim nächsten Abruf ersetzt
+                rtt = self.rtt
+                cnt_bytes = self.bytes_fetch
+
+                io_dicts = None
+                if not self.inponly or self.__refreshouts or \
+                        tm_start - tm_outs >= self.out_interval:
+                    self.__refreshouts = False
+                    tm_outs = tm_start
+                else:
+                    io_dicts = [self.dict_decinps]
+                tm_decode = perf_counter()
+                lst_changes = self._decodevalues(
+                    ba_values, io_dicts, delta=True
+                )
+                tm_decode = perf_counter() - tm_decode
+                qu_values.put((lst_changes, (rtt, cnt_bytes, tm_decode)))
+
+                # Intervall an gemittelte Antwortzeit anpassen
+                rtt_avg = rtt if rtt_avg is None \
+                    else rtt_avg * 0.75 + rtt * 0.25
+                self.interval = min(
+                    max(rtt_avg * 4, self.min_interval), self.max_interval
+                )
+
+            # Abfragerate unabhängig von der Dauer der Abfrage halten
+            evt_stop.wait(self.interval - (perf_counter() - tm_start))
+
     def _warnwrite(self):
         u"""Warnung für Benutzer über Schreibfunktion einmal fragen.
         @return True, wenn Warnung einmal mit OK bestätigt wurde"""
@@ -306,147 +1564,441 @@ class RevPiCheckClient(tkinter.Frame):
             )
         return not self.__checkwrite
 
-    def _workvalues(self, io_dicts=None, writeout=False):
+    def _workerror(self):
+        u"""Zählt Fehler beim Abrufen und beendet ggf. den Watch-Mode."""
+        if self.autorw.get():
+            self.err_workvalues += 1
+        else:
+            self.err_workvalues = self.max_errors
+
+        if self.err_workvalues >= self.max_errors:
+            # Fenster zerstören bei zu vielen Fehlern
+            self.hideallwindows()
+            if self.autorw.get():
+                self.autorw.set(False)
+                self.toggleauto()
+            self.dowrite.set(False)
+            self.pack_forget()
+
+            tkmsg.showerror(
+                _("Error"),
+                _("To many errors while reading IO data. "
+                    "Can not show the Watch-Mode."),
+                parent=self.master
+            )
+
+    def _workvalues(self, io_dicts=None, devices=None):
         u"""Alle Werte der Inputs und Outputs abrufen.
 
-        @param io_dicts Arbeit nur für dieses Dict()
-        @param writeout Änderungen auf RevPi schreiben
+        @param io_dicts Arbeit nur für diese IODecoder Dicts
+        @param devices Arbeit nur für diese Devices, sonst lst_active
         @return None
 
         """
-        # Abfragelisten vorbereiten
-        if io_dicts is None:
-            io_dicts = [self.dict_inps, self.dict_outs]
-
         # Werte abrufen
-        with self.lk:
-            try:
-                ba_values = bytearray(self.cli.ps_values().data)
-                self.err_workvalues = 0
-            except Exception:
-                if self.autorw.get():
-                    self.err_workvalues += 1
-                else:
-                    self.err_workvalues = self.max_errors
-
-                if self.err_workvalues >= self.max_errors:
-                    # Fenster zerstören bei zu vielen Fehlern
-                    self.hideallwindows()
-                    if self.autorw.get():
-                        self.autorw.set(False)
-                        self.toggleauto()
-                    self.dowrite.set(False)
-                    self.pack_forget()
-
-                    tkmsg.showerror(
-                        _("Error"),
-                        _("To many errors while reading IO data. "
-                            "Can not show the Watch-Mode."),
-                        parent=self.master
-                    )
+        ba_values = self._fetchvalues()
+        if ba_values is None:
+            self._workerror()
+            return None
+        self.err_workvalues = 0
 
-                return None
+        self._applyvalues(
+            self._decodevalues(ba_values, io_dicts, devices=devices)
+        )
 
-        # Multicall zum Schreiben vorbereiten
-        if writeout:
-            xmlmc = MultiCall(self.cli)
+    def _writeoutputs(self, lst_write):
+        u"""Schreibt geänderte Outputs auf den RevPi.
 
-        for dev in self.dict_devices:
-            # io = [name,blen,baddr,bmk,bitaddr,(tkinter_var),border,signed]
+        Bietet der RevPi 'ps_setbytes' an, werden Byte-IOs anhand der
+        piCtory Adressen als <offset><länge><daten> (je 2 Byte little
+        endian) in einem Binary übertragen. Bit-IOs teilen sich ihr Byte
+        mit anderen IOs, die das SPS Programm gleichzeitig setzen könnte,
+        und werden wie alle nicht umwandelbaren Werte per ps_setvalue
+        bitgenau geschrieben.
 
-            # IO Typ verarbeiten
-            for iotype in io_dicts:
-                # ios verarbeiten
-                for io in iotype[dev]:
+        Ohne Unterstützung oder bei Fehlern wird ps_setvalue für jeden
+        Output per Multicall gesendet.
 
-                    # Gesperrte Variable überspringen
-                    if io[5] == self.__lockedvar:
-                        continue
+        @param lst_write list() mit (device, io, value) der Outputs
 
-                    # Bytes umwandeln
-                    int_byte = int.from_bytes(
-                        ba_values[io[2]:io[2] + io[1]],
-                        byteorder="little" if len(io) < 7 else io[6],
-                        signed=False if len(io) < 8 else io[7],
-                    )
-                    if io[4] >= 0:
-                        # Bit-IO
-                        new_val = bool(int_byte & 1 << io[4])
-                        if writeout and new_val != io[5].get():
-                            xmlmc.ps_setvalue(dev, io[0], io[5].get())
-                        else:
-                            io[5].set(new_val)
-                    else:
-                        # Byte-IO
-                        if writeout and int_byte != io[5].get():
-                            xmlmc.ps_setvalue(dev, io[0], io[5].get())
-                        else:
-                            io[5].set(int_byte)
+        """
+        lst_multi = lst_write
+        if self.rawwrite:
+            lst_multi = []
+            ba_send = bytearray()
+            for dev, io, value in lst_write:
+                bytebuff = _encodeio(io, value)
+                if bytebuff is None or io.slc.stop > 0xffff:
+                    lst_multi.append((dev, io, value))
+                else:
+                    ba_send += pack("<HH", io.baddr, io.blen) + bytebuff
+
+            if ba_send:
+                try:
+                    with self.lk_cli:
+                        rc = self.cli.ps_setbytes(Binary(bytes(ba_send)))
+                except Exception:
+                    rc = False
+                if not rc:
+                    lst_multi = lst_write
+
+        if not lst_multi:
+            return None
 
         # Werte per Multicall schreiben
-        if writeout:
+        xmlmc = MultiCall(self.cli)
+        for dev, io, value in lst_multi:
+            xmlmc.ps_setvalue(dev, io.name, value)
+        with self.lk_cli:
+            self.validatereturn(xmlmc())
+
+    def checkpictory(self, callback):
+        u"""Prüft im Hintergrund, ob sich die piCtory Konfiguration ändert.
+
+        Bei geänderter Konfiguration wird das zwischengespeicherte Layout
+        verworfen und callback im tkinter Thread aufgerufen.
+
+        @param callback Funktion ohne Parameter zum Neuaufbau
+
+        """
+        if self.__th_pictory is not None and self.__th_pictory.is_alive():
+            return None
+
+        qu_hash = Queue()
+        self.__th_pictory = Thread(
+            target=lambda: qu_hash.put(self.getpictoryhash()), daemon=True
+        )
+        self.__th_pictory.start()
+        self.tmr_pictory(qu_hash, callback)
+
+    def clearchanges(self):
+        u"""Leert die Liste der Wertänderungen."""
+        self.changelog.clear()
+        self.lst_changes.delete(0, "end")
+
+    def closereplay(self):
+        u"""Beendet die Wiedergabe und zeigt wieder die Werte vom RevPi."""
+        if self.replay is None:
+            return None
+
+        self.__pausereplay()
+        self.replaywin.destroy()
+        self.replaywin = None
+        self.replay.close()
+        self.replay = None
+        self.__ba_replay = None
+
+        self.btn_refresh["state"] = "normal"
+        self.btn_read["state"] = "normal"
+        self.btn_write["state"] = "normal" if self.xmlmode >= 3 \
+            else "disabled"
+        self.chk_auto["state"] = "normal"
+
+        self.__fullrefresh = True
+        self._workvalues()
+
+    def closetrend(self):
+        u"""Schließt das Fenster der Verläufe und verwirft alle Werte."""
+        self.dict_trends.clear()
+        if self.trendwin is not None:
+            self.trendwin.master.destroy()
+            self.trendwin = None
+
+    def destroy(self):
+        u"""Beendet Abfragethread und Timer und zerstört das Frame."""
+        self.__evt_stop.set()
+        self.autorw.set(False)
+        if self.__tmr_values is not None:
+            self.master.after_cancel(self.__tmr_values)
+            self.__tmr_values = None
+        if self.__tmr_writes is not None:
+            self.master.after_cancel(self.__tmr_writes)
+            self.__tmr_writes = None
+        if self.replay is not None:
+            self.__pausereplay()
+            self.replay.close()
+            self.replay = None
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
+        super().destroy()
+
+    def getpictoryhash(self):
+        u"""Errechnet den Hash der piCtory Konfiguration auf dem RevPi.
+
+        Verwendet die Verbindung des Abfragethreads und kann deshalb auch
+        außerhalb des tkinter Threads aufgerufen werden.
+
+        @return Hash als <class 'str'> oder None, wenn nicht abrufbar
+
+        """
+        try:
             with self.lk:
-                self.validatereturn(xmlmc())
+                return sha256(
+                    self.cli_values.get_pictoryrsc().data
+                ).hexdigest()
+        except Exception:
+            return None
 
     def hideallwindows(self):
         u"""Versteckt alle Fenster."""
+        self.lst_active = []
         for win in self.dict_wins:
             self.dict_wins[win].withdraw()
+        self.hidepinwin()
+
+    def hidepinwin(self):
+        u"""Versteckt das Fenster der angehefteten IOs."""
+        self.pinactive = False
+        if self.pinwin is not None:
+            self.pinwin.withdraw()
 
     def maxint(self, io):
-        u"""Errechnet maximalen int() Wert für Bytes max 22.
-        @param io IO-Liste, deren Wert berechnet werden soll
+        u"""Gibt maximalen int() Wert für Bytes max 22 zurück.
+        @param io IOEntry, dessen Wert abgefragt wird
         @return int() max oder 0 bei Überschreitung"""
-        # io = [name,blen,baddr,bmk,bitaddr,(tkinter_var),border,signed]
-        bytelen = io[1]
-        if bytelen == 0:
-            return 0
-        signed = io[-1] if type(io[-1]) == bool else False
-        return 0 if bytelen > 22 else int.from_bytes(
-            (b'\x7f' if signed else b'\xff') + b'\xff' * (bytelen - 1),
-            byteorder="big"
-        )
+        return io.max
 
     def minint(self, io):
-        u"""Errechnet maximalen int() Wert für Bytes max 22.
-        @param io IO-Liste, deren Wert berechnet werden soll
-        @return int() max oder 0 bei Überschreitung"""
-        # io = [name,blen,baddr,bmk,bitaddr,(tkinter_var),border,signed]
-        bytelen = io[1]
-        if bytelen == 0:
-            return 0
-        signed = io[-1] if type(io[-1]) == bool else False
-        rc = 0 if bytelen > 22 or not signed else int.from_bytes(
-            b'\x80' + b'\x00' * (bytelen - 1),
-            byteorder="big",
-            signed=True
+        u"""Gibt minimalen int() Wert für Bytes max 22 zurück.
+        @param io IOEntry, dessen Wert abgefragt wird
+        @return int() min oder 0 bei Überschreitung"""
+        return io.min
+
+    def openreplay(self):
+        u"""Öffnet eine Aufzeichnung und zeigt sie statt der Live-Werte."""
+        if self.replay is not None:
+            self.replaywin.deiconify()
+            return None
+
+        filename = tkfd.askopenfilename(
+            filetypes=(
+                (_("Process image recording"), "*.rpirec"),
+                (_("All files"), "*.*")
+            ),
+            parent=self.master,
+            title=_("Replay recording...")
         )
-        return rc
+        if not filename:
+            return None
+
+        try:
+            replay = ImageReplay(filename)
+        except (OSError, ValueError):
+            tkmsg.showerror(
+                _("Error"),
+                _("Could not load the recording file!"),
+                parent=self.master
+            )
+            return None
+
+        # Live-Abfrage während der Wiedergabe beenden
+        if self.autorw.get():
+            self.autorw.set(False)
+            self.toggleauto()
+        self.dowrite.set(False)
+        for widget in (
+                self.btn_refresh, self.btn_read, self.btn_write,
+                self.chk_auto, self.chk_dowrite):
+            widget["state"] = "disabled"
+
+        # Abbild vor der Quelle setzen, der Abfragethread könnte noch laufen
+        self.__ba_replay = replay.seek(replay.tm_start)[1]
+        self.replay = replay
+        self.__fullrefresh = True
+        self._createreplaywin()
+        self._showreplay(replay.tm_start, self.__ba_replay)
+
+    def pinio(self, io):
+        u"""Heftet ein IO an und zeigt das Fenster der angehefteten IOs.
+        @param io IOEntry des IOs"""
+        if io not in self.lst_pinned:
+            self.lst_pinned.append(io)
+            self._createpinwin()
+        self.showpinwin()
+
+    def playreplay(self):
+        u"""Startet oder pausiert die Wiedergabe in Echtzeit."""
+        if self.__replaystart is not None:
+            self.__pausereplay()
+            return None
+
+        # Am Ende von vorne beginnen
+        if self.replay.peek() is None:
+            self._showreplay(*self.replay.seek(self.replay.tm_start))
+
+        self.__replaystart = (perf_counter(), self.__tm_replay)
+        self.btn_replayplay["text"] = _("Pause")
+        self.tmr_replay()
 
     def readvalues(self):
         u"""Ruft nur Input Werte von RevPi ab und aktualisiert Fenster."""
         if not self.autorw.get():
-            self._workvalues([self.dict_inps])
+            # Auch verborgene Fenster aktualisieren
+            self._workvalues([self.dict_decinps], list(self.dict_decinps))
 
     def refreshvalues(self):
         u"""Ruft alle IO Werte von RevPi ab und aktualisiert Fenster."""
         if not self.autorw.get():
-            self._workvalues()
+            # Auch verborgene Fenster aktualisieren
+            self._workvalues(devices=list(self.dict_decinps))
+
+    def saveperf(self):
+        u"""Speichert die gesammelten Leistungswerte als CSV-Datei."""
+        filename = tkfd.asksaveasfilename(
+            defaultextension=".csv",
+            filetypes=(
+                (_("CSV file"), "*.csv"),
+                (_("All files"), "*.*")
+            ),
+            parent=self.master,
+            title=_("Save as CSV...")
+        )
+        if not filename:
+            return None
+
+        try:
+            with open(filename, "w", newline="") as fh:
+                wr = csv.writer(fh)
+                wr.writerow((
+                    "time", "fetch_ms", "bytes", "decode_ms", "tk_ms",
+                    "widgets", "hz"
+                ))
+                tm_last = None
+                for tm, rtt, cnt_bytes, tm_dec, tm_tk, cnt_upd in \
+                        list(self.lst_perf):
+                    wr.writerow((
+                        "{0:.3f}".format(tm),
+                        "{0:.3f}".format(rtt * 1000),
+                        cnt_bytes,
+                        "{0:.3f}".format(tm_dec * 1000),
+                        "{0:.3f}".format(tm_tk * 1000),
+                        cnt_upd,
+                        "" if tm_last is None or tm <= tm_last
+                        else "{0:.2f}".format(1 / (tm - tm_last))
+                    ))
+                    tm_last = tm
+        except OSError:
+            tkmsg.showerror(
+                _("Error"),
+                _("Could not save the file!"),
+                parent=self.master
+            )
+
+    def scrubreplay(self, value):
+        u"""Springt zur Position des Schiebereglers.
+        @param value Sekunden ab Beginn der Aufzeichnung"""
+        pos = float(value)
+
+        # Vom Setzen der Variable in _showreplay ausgelöst
+        if abs(pos - self.__tm_replay) < 0.1:
+            return None
+
+        self._showreplay(*self.replay.seek(self.replay.tm_start + pos))
+        if self.__replaystart is not None:
+            self.__replaystart = (perf_counter(), self.__tm_replay)
+
+    def setmininterval(self):
+        u"""Übernimmt das minimale Abfrageintervall aus dem Spinbox."""
+        self.min_interval = self.var_mininterval.get() / 1000
+
+    def showpinwin(self):
+        u"""Zeigt das Fenster der angehefteten IOs mit aktuellen Werten."""
+        if self.pinwin is None:
+            return None
+        self.pinwin.deiconify()
+        self.pinactive = True
+
+        if self.autorw.get():
+            self.__fullrefresh = True
+        else:
+            self._workvalues(devices=[_pinkey])
+
+    def stepreplay(self):
+        u"""Hält die Wiedergabe an und zeigt das nächste Abbild."""
+        self.__pausereplay()
+        rec = self.replay.next()
+        if rec is not None:
+            self._showreplay(*rec)
+
+    def tmr_pictory(self, qu_hash, callback):
+        u"""Timer für das Ergebnis von checkpictory.
+        @param qu_hash Queue mit dem Hash der piCtory Konfiguration
+        @param callback Funktion bei geänderter Konfiguration"""
+        try:
+            pictoryhash = qu_hash.get_nowait()
+        except Empty:
+            self.master.after(100, self.tmr_pictory, qu_hash, callback)
+            return None
+
+        # Frame könnte inzwischen zerstört worden sein
+        if pictoryhash is None or pictoryhash == self.pictoryhash or \
+                not self.winfo_exists():
+            return None
+
+        if self.revpi is not None:
+            _savelayout(self.revpi, {})
+        callback()
+
+    def tmr_replay(self):
+        u"""Timer der Wiedergabe, zeigt das Abbild zur abgelaufenen Zeit."""
+        self.__tmr_replay = None
+        tm_wall, pos = self.__replaystart
+        target = self.replay.tm_start + pos + perf_counter() - tm_wall
+
+        # Bis zum letzten Abbild vor der Zielzeit vorspulen
+        rec = None
+        while True:
+            timestamp = self.replay.peek()
+            if timestamp is None or timestamp > target:
+                break
+            rec = self.replay.next()
+        if rec is not None:
+            self._showreplay(*rec)
+
+        if timestamp is None:
+            self.__pausereplay()
+        else:
+            self.__tmr_replay = self.master.after(100, self.tmr_replay)
 
     def tmr_workvalues(self):
-        u"""Timer für zyklische Abfrage.
+        u"""Timer für die Übernahme der Werte aus dem Abfragethread.
         @return None"""
+        self.__tmr_values = None
+
         # Verbleibener Timer könnte schon ungültig sein
         if not self.autorw.get():
+            if self.__th_values is not None and self.__th_values.is_alive():
+                # Laufende Abfrage des Threads abwarten
+                self.__tmr_values = self.master.after(
+                    50, self.tmr_workvalues
+                )
+                return None
             try:
-                self.chk_auto["state"] = "normal"
+                self.chk_auto["state"] = "normal" if self.replay is None \
+                    else "disabled"
             except Exception:
                 pass
             return None
 
-        self._workvalues()
+        # Alle fertigen Ergebnisse übernehmen
+        while self.autorw.get():
+            try:
+                result = self.__qu_values.get_nowait()
+            except Empty:
+                break
+
+            if result is None:
+                self._workerror()
+            else:
+                self.err_workvalues = 0
+                self._applyvalues(*result)
 
-        self.master.after(200, self.tmr_workvalues)
+        self.var_rate.set(_("Rate: {0:.1f} Hz / RTT: {1:.0f} ms").format(
+            1 / self.interval, self.rtt * 1000
+        ))
+
+        self.__tmr_values = self.master.after(50, self.tmr_workvalues)
 
     def toggleauto(self):
         u"""Schaltet zwischen Autorefresh um und aktualisiert Widgets."""
@@ -460,11 +2012,101 @@ class RevPiCheckClient(tkinter.Frame):
             and self.autorw.get() else "disabled"
 
         if self.autorw.get():
+            # Nicht geschriebene Eingaben werden vom Autorefresh verworfen
+            self.__dict_edits = {}
+
+            # Abfragethread mit eigener Queue starten
+            self.__fullrefresh = True
+            self.__evt_stop = Event()
+            self.__qu_values = Queue()
+            self.__th_values = Thread(
+                target=self._thworkvalues,
+                args=(self.__evt_stop, self.__qu_values),
+                daemon=True
+            )
+            self.__th_values.start()
+
+            # Timer eines vorherigen Threads nicht doppelt laufen lassen
+            if self.__tmr_values is not None:
+                self.master.after_cancel(self.__tmr_values)
             self.tmr_workvalues()
         else:
+            self.__evt_stop.set()
             self.chk_auto["state"] = "disabled"
             self.dowrite.set(False)
 
+    def togglechanges(self):
+        u"""Zeigt oder verbirgt die Seitenleiste mit Wertänderungen."""
+        if self.var_changes.get():
+            self.chggrp.pack(fill="both", side="right")
+            self._showchanges()
+        else:
+            self.chggrp.pack_forget()
+
+    def toggleinponly(self):
+        u"""Schaltet die seltenere Umwandlung der Outputs um."""
+        self.inponly = self.var_inponly.get()
+        self.__refreshouts = True
+
+    def toggleperf(self):
+        u"""Zeigt oder verbirgt die Leistungswerte."""
+        if self.var_showperf.get():
+            self.frm_perf.pack(anchor="w", fill="x")
+            self._showperf()
+        else:
+            self.frm_perf.pack_forget()
+
+    def togglerecord(self):
+        u"""Startet oder beendet die Aufzeichnung der Prozessabbilder."""
+        if not self.var_record.get():
+            if self.recorder is not None:
+                self.recorder.close()
+                self.recorder = None
+            return None
+
+        filename = tkfd.asksaveasfilename(
+            defaultextension=".rpirec",
+            filetypes=(
+                (_("Process image recording"), "*.rpirec"),
+                (_("All files"), "*.*")
+            ),
+            parent=self.master,
+            title=_("Record values to file...")
+        )
+        if not filename:
+            self.var_record.set(False)
+            return None
+
+        try:
+            self.recorder = ImageRecorder(filename)
+        except OSError:
+            self.var_record.set(False)
+            tkmsg.showerror(
+                _("Error"),
+                _("Could not create the recording file!"),
+                parent=self.master
+            )
+
+    def toggletrend(self, device, io):
+        u"""Fügt ein IO zum Verlauf hinzu oder entfernt es.
+        @param device Deviceposition des IOs
+        @param io IOEntry des IOs"""
+        if io is None:
+            return None
+
+        key = (device, io.name)
+        if key in self.dict_trends:
+            del self.dict_trends[key]
+        else:
+            self.dict_trends[key] = TrendSeries(device, io)
+
+        if self.trendwin is None:
+            win = tkinter.Toplevel(self)
+            win.protocol("WM_DELETE_WINDOW", self.closetrend)
+            self.trendwin = RevPiTrend(win, self.dict_trends)
+        else:
+            self.trendwin.master.deiconify()
+
     def togglewrite(self):
         u"""Schaltet zwischen DoWrite um und aktiviert Schreibfunktion."""
         if self._warnwrite():
@@ -472,6 +2114,23 @@ class RevPiCheckClient(tkinter.Frame):
         else:
             self.dowrite.set(False)
 
+    def unpinio(self, io):
+        u"""Entfernt ein IO aus den angehefteten IOs.
+        @param io IOEntry des IOs"""
+        if io in self.lst_pinned:
+            self.lst_pinned.remove(io)
+
+            # Variable nur behalten, wenn das Devicefenster ein eigenes
+            # Steuerelement für das IO hat und keine IO-Liste
+            lst_io = self.dict_inps[io.device] \
+                if io in self.dict_inps[io.device] \
+                else self.dict_outs[io.device]
+            if io.device not in self.dict_wins or \
+                    len(lst_io) > self.max_iorows:
+                io.var = None
+
+            self._createpinwin()
+
     def validatereturn(self, returnlist):
         u"""Überprüft die Rückgaben der setvalue Funktion.
         @param returnlist list() der xml Rückgabe"""
@@ -495,4 +2154,11 @@ class RevPiCheckClient(tkinter.Frame):
     def writevalues(self):
         u"""Schreibt geänderte Outputs auf den RevPi."""
         if self._warnwrite() and not self.autorw.get():
-            self._workvalues([self.dict_outs], True)
+            # Nur eingegebene Outputs schreiben, alle anderen könnte das
+            # SPS Programm inzwischen geändert haben
+            lst_write = [
+                (dev, io, io.value) for dev, io in self.__dict_edits.values()
+            ]
+            self.__dict_edits = {}
+            if lst_write:
+                self._writeoutputs(lst_write)
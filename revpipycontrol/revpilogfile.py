@@ -5,34 +5,257 @@ __author__ = "Sven Sager"
 __copyright__ = "Copyright (C) 2018 Sven Sager"
 __license__ = "GPLv3"
 
+import codecs
 import tkinter
+from collections import deque
 from mytools import gettrans
+from queue import Empty, Queue
+from threading import Event, Thread
+from time import perf_counter
 
 # Übersetzung laden
 _ = gettrans()
 
 
+def _fetchlog(
+        xmlcall, startposition, loadblock, maxblock=None, endposition=None):
+    u"""Lädt Logdaten ab einer Position blockweise herunter.
+
+    Jeder Block wird sofort inkrementell dekodiert, es liegt nie das ganze
+    Logbuch als bytes im Speicher. Am Ende angefangene UTF-8 Zeichen werden
+    beim nächsten Abruf erneut geladen.
+
+    Jeder Abruf beginnt mit loadblock Bytes. Solange volle Blöcke kommen,
+    wird die Blockgröße bis maxblock verdoppelt.
+
+    @param xmlcall xmlrpc Funktion zum Abrufen der Logdaten
+    @param startposition Startposition ab der Logdaten kommen sollen
+    @param loadblock Größe des ersten angeforderten Blocks
+    @param maxblock Maximale Blockgröße, None für feste Blockgröße
+    @param endposition Nur bis zu dieser Position laden, None bis zum Ende
+    @return (text, neue startposition, Steuerzeichen des RevPi oder None)
+
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    lst_text = []
+    blocksize = loadblock
+    while True:
+        count = blocksize if endposition is None \
+            else min(blocksize, endposition - startposition)
+        if count <= 0:
+            break
+
+        # Datenblock vom XML-RPC Server holen
+        bytebuff = xmlcall(startposition, count).data
+
+        # 'ESC' kein Zugriff, 'EndOfMedia' Logdatei neu begonnen
+        if bytebuff == b'\x16' or bytebuff == b'\x19':
+            return "", startposition, bytebuff
+
+        lst_text.append(decoder.decode(bytebuff))
+        startposition += len(bytebuff)
+
+        # Prüfen ob alle Daten übertragen wurden
+        if len(bytebuff) < count:
+            break
+
+        # Es folgen weitere Daten, weniger Abrufe mit größeren Blöcken
+        if maxblock is not None and blocksize < maxblock:
+            blocksize = min(blocksize * 2, maxblock)
+
+    startposition -= len(decoder.getstate()[0])
+    return "".join(lst_text), startposition, None
+
+
+def _linestart(xmlcall, position, loadblock, endposition=None):
+    u"""Sucht den Beginn der ersten Zeile ab einer Position.
+
+    @param xmlcall xmlrpc Funktion zum Abrufen der Logdaten
+    @param position Position ab der gesucht wird
+    @param loadblock Größe der angeforderten Blöcke
+    @param endposition Nur bis zu dieser Position suchen, None bis zum Ende
+    @return Position der ersten Zeile, sonst Ende der Suche
+
+    """
+    if position <= 0:
+        return 0
+
+    # Zeile beginnt hinter einem Zeilenumbruch
+    position -= 1
+    while endposition is None or position < endposition:
+        count = loadblock if endposition is None \
+            else min(loadblock, endposition - position)
+        bytebuff = xmlcall(position, count).data
+        if not bytebuff or bytebuff == b'\x16' or bytebuff == b'\x19':
+            break
+
+        index = bytebuff.find(b'\n')
+        if index >= 0:
+            return position + index + 1
+        position += len(bytebuff)
+
+    return position if endposition is None else endposition
+
+
+def _logsize(xmlcall, accuracy):
+    u"""Ermittelt die Größe einer Logdatei ohne sie herunterzuladen.
+
+    Ab dem Dateiende liefert der RevPi keine Daten bzw. 'EndOfMedia'. Die
+    Größe wird mit Abrufen von je einem Byte exponentiell und danach binär
+    eingegrenzt.
+
+    @param xmlcall xmlrpc Funktion zum Abrufen der Logdaten
+    @param accuracy Gewünschte Genauigkeit in Bytes
+    @return Position vor dem Dateiende (max. accuracy Bytes) oder None,
+        wenn kein Zugriff auf die Logdatei besteht
+
+    """
+    def isdata(position):
+        bytebuff = xmlcall(position, 1).data
+        return bytebuff != b'' and bytebuff != b'\x19'
+
+    bytebuff = xmlcall(0, 1).data
+    if bytebuff == b'\x16':
+        return None
+    if bytebuff == b'' or bytebuff == b'\x19':
+        return 0
+
+    # Position vor (low) und ab (high) dem Dateiende suchen
+    low = 0
+    high = accuracy
+    while isdata(high):
+        low = high
+        high *= 2
+    while high - low > accuracy:
+        middle = (low + high) // 2
+        if isdata(middle):
+            low = middle
+        else:
+            high = middle
+
+    return low
+
+
+def _tailposition(xmlcall, tailsize, loadblock):
+    u"""Ermittelt die Startposition der letzten tailsize Bytes einer Logdatei.
+
+    @param xmlcall xmlrpc Funktion zum Abrufen der Logdaten
+    @param tailsize Anzahl der Bytes am Ende der Logdatei
+    @param loadblock Genauigkeit und Größe der angeforderten Blöcke
+    @return Position einer Zeile, ab der geladen werden soll
+
+    """
+    position = _logsize(xmlcall, loadblock)
+    if not position or position <= tailsize:
+        return 0
+    return _linestart(xmlcall, position - tailsize, loadblock)
+
+
+def _lastlines(text, maxlines):
+    u"""Kürzt einen Text auf die letzten maxlines Zeilen.
+
+    @param text Text mit Zeilenumbrüchen
+    @param maxlines Anzahl der Zeilen, die stehen bleiben
+    @return (text, entfernte Zeilen, Länge der entfernten Zeilen in Bytes)
+
+    """
+    index = len(text)
+    for i in range(maxlines + 1):
+        index = text.rfind("\n", 0, index)
+        if index < 0:
+            return text, 0, 0
+
+    return text[index + 1:], text.count("\n", 0, index + 1), \
+        len(text[:index + 1].encode("utf-8"))
+
+
+class LogPane():
+
+    u"""Zustand eines Logbuchs im Fenster.
+
+    position wird nur im Abfragethread verwendet, alle anderen Attribute
+    nur im tkinter Thread.
+
+    """
+
+    def __init__(self, xmlcall, textwidget):
+        u"""Init LogPane class.
+
+        @param xmlcall xmlrpc Funktion zum Abrufen der Logdaten
+        @param textwidget Widget in das Logs eingefügt werden
+
+        """
+        self.xmlcall = xmlcall
+        self.textwidget = textwidget
+
+        # Nächste Leseposition des Abfragethreads, None bis das Ende des
+        # Logbuchs erfolgreich geladen wurde
+        self.position = None
+
+        # Ende der empfangenen Daten und Position der ersten Zeile im Widget
+        self.end = 0
+        self.top = 0
+
+        # Noch einzufügende Texte als (index, text)
+        self.lst_pending = deque()
+        self.trimmed = 0
+        self.var_trimmed = tkinter.StringVar()
+
+
 class RevPiLogfile(tkinter.Frame):
 
-    u"""Baut Fenster für Logfiles."""
+    u"""Baut Fenster für Logfiles.
+
+    Die Logbücher werden in einem eigenen Thread abgerufen, der die
+    dekodierten Texte über eine Queue übergibt. Je Timerdurchlauf werden
+    höchstens maxinsert Zeichen je Logbuch in die Widgets eingefügt.
+
+    """
 
     def __init__(self, master, xmlcli):
-        u"""Init RevPiLogfile-Class."""
+        u"""Init RevPiLogfile-Class.
+
+        @param master tkinter Toplevel des Fensters
+        @param xmlcli ServerProxy, wird nur im Abfragethread verwendet
+
+        """
         super().__init__(master)
         self.master.bind("<KeyPress-Escape>", self._checkclose)
         self.pack(fill="both", expand=True)
         self.xmlcli = xmlcli
 
-        # Systemvariablen
+        # Systemvariablen, Blockgröße wächst beim Laden bis maxblock
+        self.interval = 1.0
         self.loadblock = 16384
-        self.errapp = 0
-        self.errplc = 0
-        self.mrkapp = 0
-        self.mrkplc = 0
+        self.maxblock = 1048576
+        self.maxinsert = 32768
+        self.err = 0
+
+        # Beim Öffnen nur das Ende laden (0 = ganzes Logbuch)
+        self.tailsize = 262144
+
+        # Zeilen je Logbuch begrenzen
+        self.maxlines = 10000
+        self.var_maxlines = tkinter.IntVar(value=self.maxlines)
 
         # Fenster bauen
         self._createwidgets()
 
+        # Abfragethread starten, Anfragen an den Thread über qu_request
+        self.__evt_stop = Event()
+        self.__qu_logs = Queue()
+        self.__qu_request = Queue()
+        for pane in self.lst_panes:
+            self.__qu_request.put((pane, "full", None))
+        self.__th_logs = Thread(
+            target=self._thworklogs,
+            args=(self.__evt_stop, self.__qu_request, self.__qu_logs),
+            daemon=True
+        )
+        self.__th_logs.start()
+        self.__tmr_logs = None
+        self.tmr_logs()
+
     def _checkclose(self, event=None):
         u"""Prüft ob Fenster beendet werden soll.
         @param event tkinter-Event"""
@@ -44,6 +267,7 @@ class RevPiLogfile(tkinter.Frame):
 
         self.rowconfigure(0, weight=0)
         self.rowconfigure(1, weight=1)
+        self.rowconfigure(2, weight=0)
         self.columnconfigure(0, weight=1)
         self.columnconfigure(1, weight=0)
         self.columnconfigure(2, weight=0)
@@ -66,6 +290,15 @@ class RevPiLogfile(tkinter.Frame):
         self.plcscr.grid(sticky="ns", column=2, row=1)
         self.plclog["yscrollcommand"] = self.plcscr.set
         self.plcscr["command"] = self.plclog.yview
+        self.plcpane = LogPane(self.xmlcli.load_plclog, self.plclog)
+
+        lbl = tkinter.Label(self)
+        lbl["textvariable"] = self.plcpane.var_trimmed
+        lbl.grid(column=0, row=2, sticky="w")
+        btn = tkinter.Button(self)
+        btn["command"] = self.btn_olderplc
+        btn["text"] = _("Older lines")
+        btn.grid(column=1, row=2, sticky="e")
 
         # APP Log
         self.lblapplog = tkinter.Label(self)
@@ -82,93 +315,279 @@ class RevPiLogfile(tkinter.Frame):
         self.appscr.grid(sticky="ns", column=5, row=1)
         self.applog["yscrollcommand"] = self.appscr.set
         self.appscr["command"] = self.applog.yview
+        self.apppane = LogPane(self.xmlcli.load_applog, self.applog)
+
+        lbl = tkinter.Label(self)
+        lbl["textvariable"] = self.apppane.var_trimmed
+        lbl.grid(column=3, row=2, sticky="w")
+        btn = tkinter.Button(self)
+        btn["command"] = self.btn_olderapp
+        btn["text"] = _("Older lines")
+        btn.grid(column=4, row=2, sticky="e")
+
+        # Maximale Zeilen je Logbuch
+        frame = tkinter.Frame(self)
+        frame.grid(column=3, columnspan=3, row=3, sticky="e")
+        lbl = tkinter.Label(frame)
+        lbl["text"] = _("Max. lines")
+        lbl.pack(side="left")
+        txt = tkinter.Spinbox(
+            frame, from_=1000, to=100000, increment=1000, width=6,
+            state="readonly"
+        )
+        txt["command"] = self.setmaxlines
+        txt["textvariable"] = self.var_maxlines
+        txt.pack(side="left")
+
+        self.lst_panes = [self.apppane, self.plcpane]
+
+    def _clear(self, pane):
+        u"""Leert das Widget eines Logbuchs.
+        @param pane LogPane des Logbuchs"""
+        pane.textwidget.delete(1.0, tkinter.END)
+        pane.lst_pending.clear()
+        pane.top = pane.end
+        pane.trimmed = 0
+        pane.var_trimmed.set("")
+
+    def _insertpending(self, pane):
+        u"""Fügt höchstens maxinsert Zeichen der wartenden Texte ein.
+
+        Ältere Zeilen werden von hinten nach vorne am Anfang eingefügt,
+        neue Zeilen am Ende angehängt.
+
+        @param pane LogPane des Logbuchs
 
-        # Logtimer zum Laden starten
-        self.get_applog(full=True)
-        self.get_plclog(full=True)
-
-    def btn_clearapp(self):
-        u"""Leert die Logliste der App."""
-        self.applog.delete(1.0, tkinter.END)
+        """
+        textwidget = pane.textwidget
+        roll = textwidget.yview()[1] == 1.0
+        budget = self.maxinsert
+        older = False
+        while pane.lst_pending and budget > 0:
+            index, text = pane.lst_pending[0]
+            older = index != tkinter.END
+            if len(text) <= budget:
+                pane.lst_pending.popleft()
+                part = text
+            elif older:
+                part = text[-budget:]
+                pane.lst_pending[0] = (index, text[:-budget])
+            else:
+                part = text[:budget]
+                pane.lst_pending[0] = (index, text[budget:])
+
+            textwidget.insert(index, part)
+            budget -= len(part)
+
+        if older:
+            # Ältere Zeilen anzeigen, Kürzen erst nach dem Einfügen
+            textwidget.see(1.0)
+            return None
+
+        # Beim Lesen älterer Zeilen mehr Zeilen stehen lassen
+        lines, size = self._trimlog(
+            textwidget, self.maxlines if roll else 2 * self.maxlines
+        )
+        if lines:
+            pane.trimmed += lines
+            if pane.top is not None:
+                pane.top += size
 
-    def btn_clearplc(self):
-        u"""Leert die Logliste des PLC."""
-        self.plclog.delete(1.0, tkinter.END)
+        # Automatisch ans Ende rollen
+        if roll:
+            textwidget.see(tkinter.END)
 
-    def get_applog(self, full=False):
-        u"""Ruft App Logbuch ab.
-        @param full Ganzes Logbuch laden"""
+    def _receive(self, pane, request, start, end, text, trimmed, size, ctrl):
+        u"""Übernimmt ein Ergebnis des Abfragethreads.
 
-        # Logs abrufen und letzte Position merken
-        try:
-            self.mrkapp = self._load_log(
-                self.applog, self.xmlcli.load_applog, self.mrkapp, full
-            )
-            self.errapp = 0
-        except Exception:
-            self.errapp += 1
+        @param pane LogPane des Logbuchs
+        @param request "full", "older" oder "poll"
+        @param start Position der ersten geladenen Zeile
+        @param end Ende der geladenen Daten
+        @param text Geladener Text
+        @param trimmed Im Thread verworfene Zeilen
+        @param size Länge der verworfenen Zeilen in Bytes
+        @param ctrl Steuerzeichen des RevPi oder None
 
-        # Timer neu starten
-        self.master.after(1000, self.get_applog)
+        """
+        if request == "older":
+            if ctrl is None and end == pane.top and text:
+                pane.lst_pending.append((1.0, text))
+                pane.top = start
+            return None
 
-    def get_plclog(self, full=False):
-        u"""Ruft PLC Logbuch ab.
-        @param full Ganzes Logbuch laden"""
+        if request == "full":
+            self._clear(pane)
+            pane.top = start
 
-        # Logs abrufen und letzte Position merken
-        try:
-            self.mrkplc = self._load_log(
-                self.plclog, self.xmlcli.load_plclog, self.mrkplc, full
+        if ctrl == b'\x16':  # 'ESC'
+            # Kein Zugriff auf Logdatei
+            self._clear(pane)
+            pane.textwidget.insert(
+                tkinter.END, _("Can not access log file on the RevPi")
             )
-            self.errplc = 0
-        except Exception:
-            self.errplc += 1
-
-        # Timer neu starten
-        self.master.after(1000, self.get_plclog)
+            pane.top = None
+        elif ctrl == b'\x19':  # 'EndOfMedia'
+            # Logdatei neu begonnen, ältere Zeilen gibt es nicht mehr
+            pane.top = None
+        elif text:
+            if trimmed:
+                # Alle Zeilen im Widget sind älter als die verworfenen
+                trimmed += pane.trimmed + int(
+                    pane.textwidget.index("end-1c").split(".")[0]
+                ) - 1 + sum(
+                    pending.count("\n") for index, pending in
+                    pane.lst_pending if index == tkinter.END
+                )
+                top = None if pane.top is None else start + size
+                self._clear(pane)
+                pane.top = top
+                pane.trimmed = trimmed
+
+            pane.lst_pending.append((tkinter.END, text))
+
+        pane.end = end
+
+    def _thworklogs(self, evt_stop, qu_request, qu_logs):
+        u"""Ruft im Thread zyklisch die Logbücher ab.
+
+        Anfragen aus dem tkinter Thread werden sofort bearbeitet. Die
+        Ergebnisse werden als Argumente für _receive über die Queue
+        übergeben.
+
+        @param evt_stop Event zum Beenden des Threads
+        @param qu_request Queue mit Anfragen (pane, request, position)
+        @param qu_logs Queue für die Ergebnisse
 
-    def _load_log(self, textwidget, xmlcall, startposition, full):
-        u"""Läd die angegebenen Logfiles herunter.
-
-        @param textwidget Widget in das Logs eingefügt werden sollen
-        @param xmlcall xmlrpc Funktion zum Abrufen der Logdaten
-        @param startposition Startposition ab der Logdaten kommen sollen
-        @param full Komplettes Logbuch laden
-        @return Ende der Datei (neue Startposition)
+        """
+        tm_next = 0.0
+        while not evt_stop.is_set():
+            try:
+                pane, request, position = qu_request.get(
+                    timeout=max(0.0, tm_next - perf_counter())
+                )
+                lst_work = [(pane, request, position)]
+            except Empty:
+                tm_next = perf_counter() + self.interval
+                lst_work = [(pane, "poll", None) for pane in self.lst_panes]
+
+            for pane, request, position in lst_work:
+                if evt_stop.is_set():
+                    break
+
+                # Fehlgeschlagenes Laden des Endes wiederholen
+                if request == "poll" and pane.position is None:
+                    request = "full"
+                try:
+                    qu_logs.put((pane, request) + self._workrequest(
+                        pane, request, position
+                    ))
+                    self.err = 0
+                except Exception:
+                    self.err += 1
+
+    def _trimlog(self, textwidget, maxlines):
+        u"""Entfernt die ältesten Zeilen über maxlines.
+
+        Es wird erst gekürzt, wenn maxlines um 10 % überschritten ist, damit
+        nicht bei jedem Abruf Zeilen gelöscht werden.
+
+        @param textwidget Widget des Logbuchs
+        @param maxlines Anzahl der Zeilen, die stehen bleiben
+        @return (Anzahl der entfernten Zeilen, Länge in Bytes)
 
         """
-        roll = textwidget.yview()[1] == 1.0
-        startposition = 0 if full else startposition
-        logbytes = b''
-        while True:
-            # Datenblock vom XML-RPC Server holen
-            bytebuff = xmlcall(startposition, self.loadblock).data
+        lines = int(textwidget.index("end-1c").split(".")[0])
+        if lines <= maxlines + maxlines // 10:
+            return 0, 0
 
-            logbytes += bytebuff
-            startposition += len(bytebuff)
+        trimmed = lines - maxlines
+        index = "{0}.0".format(trimmed + 1)
+        size = len(textwidget.get(1.0, index).encode("utf-8"))
+        textwidget.delete(1.0, index)
+        return trimmed, size
 
-            # Prüfen ob alle Daten übertragen wurden
-            if len(bytebuff) < self.loadblock:
-                break
+    def _workrequest(self, pane, request, position):
+        u"""Lädt im Abfragethread Logdaten für eine Anfrage.
 
-        if full:
-            textwidget.delete(1.0, tkinter.END)
+        @param pane LogPane des Logbuchs
+        @param request "full", "older" oder "poll"
+        @param position Position der ersten Zeile im Widget bei "older"
+        @return (start, end, text, trimmed, size, ctrl) für _receive
 
-        if bytebuff == b'\x16':  # 'ESC'
-            # Kein Zugriff auf Logdatei
-            textwidget.delete(1.0, tkinter.END)
-            textwidget.insert(
-                tkinter.END, _("Can not access log file on the RevPi")
+        """
+        if request == "older":
+            start = _linestart(
+                pane.xmlcall, position - (self.tailsize or self.maxblock),
+                self.loadblock, position
+            )
+            text, end, ctrl = _fetchlog(
+                pane.xmlcall, start, self.loadblock, self.maxblock, position
+            )
+            return start, end, text, 0, 0, ctrl
+
+        if request == "full":
+            # Bei Fehlern nicht ab 0 weiterlesen, sondern erneut das Ende
+            pane.position = None
+            start = 0 if not self.tailsize else _tailposition(
+                pane.xmlcall, self.tailsize, self.loadblock
             )
-        elif bytebuff == b'\x19':  # 'EndOfMedia'
-            # Logdatei neu begonnen
-            startposition = 0
         else:
-            # Text in Widget übernehmen
-            textwidget.insert(tkinter.END, logbytes.decode("utf-8"))
+            start = pane.position
 
-        # Automatisch ans Ende rollen
-        if roll or full:
-            textwidget.see(tkinter.END)
+        text, end, ctrl = _fetchlog(
+            pane.xmlcall, start, self.loadblock, self.maxblock
+        )
+        pane.position = 0 if ctrl == b'\x19' else end
+
+        # Nur die letzten maxlines Zeilen übergeben
+        text, trimmed, size = _lastlines(text, self.maxlines)
+        return start, pane.position, text, trimmed, size, ctrl
+
+    def btn_clearapp(self):
+        u"""Leert die Logliste der App."""
+        self._clear(self.apppane)
+
+    def btn_clearplc(self):
+        u"""Leert die Logliste des PLC."""
+        self._clear(self.plcpane)
+
+    def btn_olderapp(self):
+        u"""Fordert ältere Zeilen des App Logbuchs an."""
+        if self.apppane.top:
+            self.__qu_request.put((self.apppane, "older", self.apppane.top))
+
+    def btn_olderplc(self):
+        u"""Fordert ältere Zeilen des PLC Logbuchs an."""
+        if self.plcpane.top:
+            self.__qu_request.put((self.plcpane, "older", self.plcpane.top))
+
+    def destroy(self):
+        u"""Beendet Abfragethread und Timer und zerstört das Frame."""
+        self.__evt_stop.set()
+        if self.__tmr_logs is not None:
+            self.after_cancel(self.__tmr_logs)
+            self.__tmr_logs = None
+        super().destroy()
+
+    def setmaxlines(self):
+        u"""Übernimmt die maximalen Zeilen aus der Spinbox."""
+        self.maxlines = self.var_maxlines.get()
+
+    def tmr_logs(self):
+        u"""Timer für die Übernahme der Logdaten aus dem Abfragethread."""
+        while True:
+            try:
+                self._receive(*self.__qu_logs.get_nowait())
+            except Empty:
+                break
+
+        for pane in self.lst_panes:
+            if pane.lst_pending:
+                self._insertpending(pane)
+                if pane.trimmed:
+                    pane.var_trimmed.set(
+                        _("{0} older lines removed").format(pane.trimmed)
+                    )
 
-        return startposition
+        self.__tmr_logs = self.after(50, self.tmr_logs)
@@ -11,6 +11,8 @@ import tkinter
 import tkinter.messagebox as tkmsg
 from mytools import gettrans
 from mytools import savefile_connections as savefile
+from revpicheckclient import _loadlayout as layoutload
+from revpicheckclient import _savelayout as layoutsave
 from revpidevelop import _loaddefaults as developloaddefaults
 from revpidevelop import _savedefaults as developsavedefaults
 from revpiprogram import _loaddefaults as programloaddefaults
@@ -165,6 +167,11 @@ class RevPiPlcList(tkinter.Frame):
             if revpi not in self._connections:
                 del dict_o[revpi]
         programsavedefaults(None, dict_o)
+        dict_o = layoutload()
+        for revpi in tuple(dict_o.keys()):
+            if revpi not in self._connections:
+                del dict_o[revpi]
+        layoutsave(None, dict_o)
 
         return True
 
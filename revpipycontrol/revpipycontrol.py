@@ -42,6 +42,7 @@ class RevPiPyControl(tkinter.Frame):
         self.errcount = 0
         self.revpiaddress = None
         self.revpiname = None
+        self.revpiurl = None
         self.revpipyversion = [0, 0, 0]
         self.xmlfuncs = []
         self.xmlmode = 0
@@ -229,11 +230,10 @@ class RevPiPyControl(tkinter.Frame):
         else:
             self._closeall()
             socket.setdefaulttimeout(6)
-            self.cli = ServerProxy(
-                "http://{0}:{1}".format(
-                    self.dict_conn[text][0], int(self.dict_conn[text][1])
-                )
+            self.revpiurl = "http://{0}:{1}".format(
+                self.dict_conn[text][0], int(self.dict_conn[text][1])
             )
+            self.cli = ServerProxy(self.revpiurl)
             self.revpiaddress = self.dict_conn[text][0]
             self.revpiname = text
             self.var_conn.set("{0} - {1}:{2}".format(
@@ -241,6 +241,22 @@ class RevPiPyControl(tkinter.Frame):
             ))
             self.mbar.entryconfig("PLC", state="normal")
 
+    def _pictorychanged(self):
+        u"""Baut den watch modus nach geänderter piCtory Konfig neu auf."""
+        if self.debugframe is None:
+            return None
+
+        visible = self.debugframe.winfo_manager() != ""
+        if self.debugframe.autorw.get():
+            self.debugframe.autorw.set(False)
+            self.debugframe.toggleauto()
+        self.debugframe.destroy()
+        self.debugframe = None
+
+        # Sichtbaren watch modus mit neuem Layout wieder anzeigen
+        if visible:
+            self.plcdebug()
+
     def infowindow(self):
         u"""Öffnet das Fenster für die Info."""
         win = tkinter.Toplevel(self)
@@ -267,11 +283,14 @@ class RevPiPyControl(tkinter.Frame):
             )
             return
 
-        # FIXME: Bei neuer piCtory Konfig schneller vernichten
+        # Hash der piCtory Konfig nur prüfen, wenn er nicht gerade beim
+        # Aufbau ohne Zwischenspeicher geladen wurde
+        checkpictory = True
         if self.debugframe is None:
             try:
                 self.debugframe = revpicheckclient.RevPiCheckClient(
-                    self.main_frame, self.cli, self.xmlmode
+                    self.main_frame, self.cli, self.xmlmode, self.revpiname,
+                    self.revpiurl
                 )
             except Exception:
                 tkmsg.showwarning(
@@ -283,6 +302,7 @@ class RevPiPyControl(tkinter.Frame):
                 )
                 self.btn_debug["state"] = "normal"
                 return None
+            checkpictory = self.debugframe.fromcache
 
         # Fehler prüfen
         if self.debugframe.err_workvalues >= self.debugframe.max_errors:
@@ -300,6 +320,10 @@ class RevPiPyControl(tkinter.Frame):
         else:
             self.debugframe.pack(fill="x")
 
+            # Bei neuer piCtory Konfig im Hintergrund neu aufbauen
+            if checkpictory:
+                self.debugframe.checkpictory(self._pictorychanged)
+
         self.btn_debug["state"] = "normal"
 
     def plcdevelop(self):
@@ -350,7 +374,11 @@ class RevPiPyControl(tkinter.Frame):
 
         if self.tklogs is None or len(self.tklogs.children) == 0:
             win = tkinter.Toplevel(self)
-            self.tklogs = revpilogfile.RevPiLogfile(win, self.cli)
+
+            # Eigene Verbindung, da die Logs in einem Thread abgerufen werden
+            self.tklogs = revpilogfile.RevPiLogfile(
+                win, ServerProxy(self.revpiurl)
+            )
         else:
             self.tklogs.focus_set()
 
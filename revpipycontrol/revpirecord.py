@@ -0,0 +1,332 @@
+# -*- coding: utf-8 -*-
+u"""Aufzeichnung von Prozessabbildern des 'watch modus'.
+
+Eine Aufzeichnung beginnt mit einem Dateikopf <magic><version>. Danach
+folgen nur angehängte Datensätze <typ><zeitstempel><länge><daten>:
+
+    REC_KEY   Komplettes Prozessabbild
+    REC_DELTA Prozessabbild XOR Vorgänger, mit zlib komprimiert
+    REC_INDEX Offset des vorherigen Index, dann <zeitstempel><offset> der
+              seit dem letzten Index geschriebenen REC_KEY Datensätze
+
+Beim Schließen wird ein Abschluss <offset letzter Index><magic> angehängt,
+über den alle Indexe rückwärts gefunden werden.
+
+"""
+
+__author__ = "Sven Sager"
+__copyright__ = "Copyright (C) 2018 Sven Sager"
+__license__ = "GPLv3"
+
+import mmap
+import os
+import zlib
+from bisect import bisect_right
+from struct import Struct
+from threading import Lock
+from time import time
+
+REC_KEY = 0
+REC_DELTA = 1
+REC_INDEX = 2
+
+_magic = b'RPIR'
+_magicend = b'RPIX'
+_version = 1
+
+# Dateikopf, Datensatzkopf, Indexeintrag und Abschluss der Datei
+_hdr = Struct("<4sH")
+_rec = Struct("<BdI")
+_idx = Struct("<dQ")
+_prev = Struct("<Q")
+_trailer = Struct("<Q4s")
+
+
+class ImageRecorder():
+
+    u"""Schreibt Prozessabbilder fortlaufend in eine Aufzeichnungsdatei.
+
+    Alle keyinterval Abbilder und bei geänderter Länge wird ein komplettes
+    Abbild geschrieben, sonst nur die komprimierte Differenz. Überschreitet
+    die Datei maxsize Bytes, wird sie nach <datei>.1 verschoben und eine
+    neue Datei begonnen.
+
+    Kann aus dem Abfragethread und dem tkinter Thread verwendet werden.
+
+    """
+
+    def __init__(
+            self, filename, keyinterval=100, indexinterval=10,
+            maxsize=268435456):
+        u"""Init ImageRecorder class.
+
+        @param filename Dateiname der Aufzeichnung
+        @param keyinterval Abstand der kompletten Abbilder
+        @param indexinterval Komplette Abbilder je Indexdatensatz
+        @param maxsize Maximale Dateigröße in Bytes vor dem Wechsel
+
+        """
+        self.filename = filename
+        self.keyinterval = keyinterval
+        self.indexinterval = indexinterval
+        self.maxsize = maxsize
+
+        self.__fh = None
+        self.__lk = Lock()
+        self.__open()
+
+    def __close(self):
+        u"""Schreibt offenen Index und Abschluss und schließt die Datei."""
+        self.__writeindex()
+        self.__fh.write(_trailer.pack(self.__previndex, _magicend))
+        self.__fh.close()
+        self.__fh = None
+
+    def __open(self):
+        u"""Legt die Datei neu an und schreibt den Dateikopf."""
+        self.__fh = open(self.filename, "wb")
+        self.__fh.write(_hdr.pack(_magic, _version))
+        self.__last = None
+        self.__cnt = 0
+        self.__lst_index = []
+        self.__previndex = 0
+
+    def __writeindex(self):
+        u"""Schreibt die gesammelten Indexeinträge als Datensatz."""
+        if not self.__lst_index:
+            return None
+
+        offset = self.__fh.tell()
+        payload = _prev.pack(self.__previndex) + b''.join(
+            _idx.pack(*entry) for entry in self.__lst_index
+        )
+        self.__fh.write(
+            _rec.pack(REC_INDEX, self.__lst_index[-1][0], len(payload))
+        )
+        self.__fh.write(payload)
+        self.__fh.flush()
+
+        self.__previndex = offset
+        self.__lst_index = []
+
+    def __write(self, ba_values, timestamp):
+        u"""Schreibt den Datensatz eines Prozessabbilds, Lock wird gehalten.
+        @param ba_values Prozessabbild als bytearray()
+        @param timestamp Zeitstempel des Abbilds"""
+        imglen = len(ba_values)
+        if self.__cnt % self.keyinterval == 0 \
+                or self.__last is None or len(self.__last) != imglen:
+            self.__lst_index.append((timestamp, self.__fh.tell()))
+            rectype = REC_KEY
+            payload = bytes(ba_values)
+        else:
+            # Geänderte Bits über das ganze Abbild auf einmal bilden
+            rectype = REC_DELTA
+            payload = zlib.compress((
+                int.from_bytes(ba_values, "little") ^
+                int.from_bytes(self.__last, "little")
+            ).to_bytes(imglen, "little"), 1)
+
+        self.__fh.write(_rec.pack(rectype, timestamp, len(payload)))
+        self.__fh.write(payload)
+        self.__last = bytes(ba_values)
+        self.__cnt += 1
+
+        if len(self.__lst_index) >= self.indexinterval:
+            self.__writeindex()
+
+        # Dateigröße begrenzen
+        if self.__fh.tell() >= self.maxsize:
+            self.__close()
+            os.replace(self.filename, self.filename + ".1")
+            self.__open()
+
+    def close(self):
+        u"""Beendet die Aufzeichnung."""
+        with self.__lk:
+            if self.__fh is not None:
+                self.__close()
+
+    def write(self, ba_values, timestamp=None):
+        u"""Hängt ein Prozessabbild an die Aufzeichnung an.
+
+        @param ba_values Prozessabbild als bytearray()
+        @param timestamp Zeitstempel, sonst aktuelle Zeit
+        @return True, wenn das Abbild geschrieben wurde, sonst False
+
+        """
+        if timestamp is None:
+            timestamp = time()
+
+        with self.__lk:
+            if self.__fh is None:
+                return False
+
+            try:
+                self.__write(ba_values, timestamp)
+            except OSError:
+                # Bei Schreibfehlern (z.B. Datenträger voll) aufhören
+                if self.__fh is not None:
+                    try:
+                        self.__fh.close()
+                    except OSError:
+                        pass
+                    self.__fh = None
+                return False
+
+        return True
+
+
+class ImageReplay():
+
+    u"""Liest Prozessabbilder aus einer Aufzeichnungsdatei.
+
+    Die Datei wird per mmap gelesen und muss nicht in den Speicher passen.
+    Über den Index der kompletten Abbilder wird per Binärsuche positioniert,
+    danach werden höchstens keyinterval Differenzen angewendet.
+
+    Fehlt der Abschluss, weil die Aufzeichnung nicht beendet wurde, wird der
+    Index einmalig aus den Datensatzköpfen aufgebaut.
+
+    """
+
+    def __init__(self, filename):
+        u"""Init ImageReplay class.
+        @param filename Dateiname der Aufzeichnung"""
+        self.filename = filename
+
+        with open(filename, "rb") as fh:
+            self.__mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self.__mm) < _hdr.size or \
+                _hdr.unpack_from(self.__mm)[0] != _magic:
+            self.__mm.close()
+            raise ValueError("file is not a process image recording")
+
+        self.lst_ts = []
+        self.lst_offset = []
+        self.__end = len(self.__mm)
+        if not self.__loadindex():
+            self.__scanindex()
+        if not self.lst_offset:
+            self.__mm.close()
+            raise ValueError("recording does not contain any images")
+
+        # Ende über das letzte komplette Abbild ermitteln
+        self.tm_start = self.lst_ts[0]
+        self.tm_end = self.seek(self.lst_ts[-1])[0]
+        while self.peek() is not None:
+            self.tm_end = self.next()[0]
+
+        self.seek(self.tm_start)
+
+    def __loadindex(self):
+        u"""Lädt den Index über den Abschluss der Datei.
+        @return True, wenn ein gültiger Abschluss vorhanden ist"""
+        if len(self.__mm) < _hdr.size + _trailer.size:
+            return False
+        offset, magic = _trailer.unpack_from(
+            self.__mm, len(self.__mm) - _trailer.size
+        )
+        if magic != _magicend:
+            return False
+
+        lst_blocks = []
+        while offset:
+            rec = self.__readrec(offset)
+            if rec is None or rec[0] != REC_INDEX:
+                return False
+            payload = rec[2]
+            lst_blocks.append(payload)
+            offset = _prev.unpack_from(payload)[0]
+
+        # Indexe wurden rückwärts gefunden
+        for payload in reversed(lst_blocks):
+            for ts, offset in _idx.iter_unpack(payload[_prev.size:]):
+                self.lst_ts.append(ts)
+                self.lst_offset.append(offset)
+
+        self.__end = len(self.__mm) - _trailer.size
+        return True
+
+    def __readrec(self, offset):
+        u"""Liest den Datensatz an einem Offset.
+        @param offset Position des Datensatzkopfs in der Datei
+        @return (typ, zeitstempel, daten, nächster offset) oder None"""
+        if offset + _rec.size > self.__end:
+            return None
+        rectype, ts, length = _rec.unpack_from(self.__mm, offset)
+        offset += _rec.size
+        if offset + length > self.__end:
+            # Abgeschnittener Datensatz einer abgebrochenen Aufzeichnung
+            return None
+        return rectype, ts, self.__mm[offset:offset + length], \
+            offset + length
+
+    def __scanindex(self):
+        u"""Baut den Index aus allen Datensatzköpfen auf."""
+        self.__end = len(self.__mm)
+        offset = _hdr.size
+        while offset + _rec.size <= self.__end:
+            rectype, ts, length = _rec.unpack_from(self.__mm, offset)
+            if offset + _rec.size + length > self.__end:
+                break
+            if rectype == REC_KEY:
+                self.lst_ts.append(ts)
+                self.lst_offset.append(offset)
+            offset += _rec.size + length
+
+        self.__end = offset
+
+    def close(self):
+        u"""Schließt die Aufzeichnung."""
+        self.__mm.close()
+
+    def next(self):
+        u"""Liest das nächste Prozessabbild.
+        @return (zeitstempel, bytearray()) oder None am Ende"""
+        while True:
+            rec = self.__readrec(self.__pos)
+            if rec is None:
+                return None
+            rectype, ts, payload, self.__pos = rec
+
+            if rectype == REC_KEY:
+                self.__image = bytearray(payload)
+            elif rectype == REC_DELTA:
+                imglen = len(self.__image)
+                self.__image = bytearray((
+                    int.from_bytes(self.__image, "little") ^
+                    int.from_bytes(zlib.decompress(payload), "little")
+                ).to_bytes(imglen, "little"))
+            else:
+                continue
+
+            return ts, self.__image
+
+    def peek(self):
+        u"""Gibt den Zeitstempel des nächsten Prozessabbilds zurück.
+        @return Zeitstempel oder None am Ende"""
+        offset = self.__pos
+        while True:
+            rec = self.__readrec(offset)
+            if rec is None:
+                return None
+            if rec[0] != REC_INDEX:
+                return rec[1]
+            offset = rec[3]
+
+    def seek(self, timestamp):
+        u"""Positioniert auf das letzte Abbild bis zum Zeitstempel.
+        @param timestamp Gesuchter Zeitpunkt
+        @return (zeitstempel, bytearray()) des gefundenen Abbilds"""
+        i = max(0, bisect_right(self.lst_ts, timestamp) - 1)
+        self.__pos = self.lst_offset[i]
+        rc = self.next()
+
+        # Differenzen bis zum Zeitstempel anwenden
+        while True:
+            ts = self.peek()
+            if ts is None or ts > timestamp:
+                return rc
+            rc = self.next()
@@ -0,0 +1,264 @@
+# -*- coding: utf-8 -*-
+u"""Zeigt den Verlauf ausgewählter IOs des 'watch modus' an."""
+
+__author__ = "Sven Sager"
+__copyright__ = "Copyright (C) 2018 Sven Sager"
+__license__ = "GPLv3"
+
+import tkinter
+from array import array
+from bisect import bisect_left
+from mytools import gettrans
+from threading import Lock
+
+# Übersetzung laden
+_ = gettrans()
+
+# Farben der Verläufe, werden reihum vergeben
+_colors = (
+    "blue", "red", "green4", "orange", "purple", "brown", "magenta4", "cyan4"
+)
+
+
+def _decimate(times, values, t_start, t_end, width):
+    u"""Fasst die Werte je Pixelspalte auf Minimum und Maximum zusammen.
+
+    Die Grenzen der Spalten werden per Binärsuche in den aufsteigenden
+    Zeitstempeln gefunden, min() und max() laufen über Slices des Arrays.
+
+    @param times array() der aufsteigenden Zeitstempel
+    @param values array() der Werte zu den Zeitstempeln
+    @param t_start Zeitpunkt am linken Rand
+    @param t_end Zeitpunkt am rechten Rand
+    @param width Anzahl der Pixelspalten
+    @return list() mit (spalte, minimum, maximum)
+
+    """
+    lst_cols = []
+    dt = (t_end - t_start) / width
+    i = bisect_left(times, t_start)
+    for col in range(width):
+        j = bisect_left(times, t_start + (col + 1) * dt, i)
+        if j > i:
+            part = values[i:j]
+            lst_cols.append((col, min(part), max(part)))
+            i = j
+    return lst_cols
+
+
+class TrendSeries():
+
+    u"""Ringpuffer mit Zeitstempeln und Werten eines IOs.
+
+    Wird aus dem Abfragethread gefüllt und im tkinter Thread gelesen.
+
+    """
+
+    def __init__(self, device, io, size=10000):
+        u"""Init TrendSeries class.
+
+        @param device Deviceposition des IOs
+        @param io IOEntry des IOs
+        @param size Maximale Anzahl gespeicherter Werte
+
+        """
+        self.device = device
+        self.io = io
+        self.size = size
+
+        self.__cnt = 0
+        self.__lk = Lock()
+        self.__pos = 0
+        self.__times = array("d", bytes(8 * size))
+        self.__values = array("d", bytes(8 * size))
+
+    def append(self, timestamp, value):
+        u"""Speichert einen Wert und überschreibt den ältesten.
+        @param timestamp Zeitstempel des Werts
+        @param value Wert des IOs"""
+        with self.__lk:
+            self.__times[self.__pos] = timestamp
+            self.__values[self.__pos] = value
+            self.__pos = (self.__pos + 1) % self.size
+            if self.__cnt < self.size:
+                self.__cnt += 1
+
+    def clear(self):
+        u"""Verwirft alle gespeicherten Werte."""
+        with self.__lk:
+            self.__cnt = 0
+            self.__pos = 0
+
+    def getdata(self):
+        u"""Gibt alle gespeicherten Werte in zeitlicher Reihenfolge zurück.
+        @return (array() Zeitstempel, array() Werte)"""
+        with self.__lk:
+            if self.__cnt < self.size:
+                return self.__times[:self.__cnt], self.__values[:self.__cnt]
+            return (
+                self.__times[self.__pos:] + self.__times[:self.__pos],
+                self.__values[self.__pos:] + self.__values[:self.__pos]
+            )
+
+
+class RevPiTrend(tkinter.Frame):
+
+    u"""Baut Fenster für den Verlauf von IOs."""
+
+    def __init__(self, master, dict_series):
+        u"""Init RevPiTrend-Class.
+
+        @param master tkinter Toplevel des Fensters
+        @param dict_series dict() mit TrendSeries, wird vom 'watch modus'
+            gepflegt
+
+        """
+        super().__init__(master)
+        self.pack(fill="both", expand=True)
+        self.dict_series = dict_series
+
+        # Systemvariablen
+        self.interval = 100
+        self.margin = 40
+        self.var_span = tkinter.IntVar(value=60)
+        self.__dict_lines = {}
+        self.__keys = ()
+        self.__tmr_draw = None
+
+        # Fenster bauen
+        self._createwidgets()
+        self.tmr_draw()
+
+    def _createlegend(self):
+        u"""Erstellt die Legende neu, wenn sich die Verläufe ändern."""
+        for widget in self.frm_legend.winfo_children():
+            widget.destroy()
+
+        # Linien entfernter Verläufe löschen
+        for key in list(self.__dict_lines):
+            if key not in self.dict_series:
+                self.canvas.delete(self.__dict_lines.pop(key))
+
+        for i, key in enumerate(self.__keys):
+            color = _colors[i % len(_colors)]
+            if key not in self.__dict_lines:
+                self.__dict_lines[key] = \
+                    self.canvas.create_line(0, 0, 0, 0, fill=color)
+            else:
+                self.canvas.itemconfigure(self.__dict_lines[key], fill=color)
+
+            lbl = tkinter.Label(self.frm_legend)
+            lbl["fg"] = color
+            lbl["text"] = self.dict_series[key].io.name
+            lbl.pack(side="left", padx=5)
+
+    def _createwidgets(self):
+        u"""Erstellt alle Widgets."""
+        self.master.wm_title(_("Trend"))
+
+        frame = tkinter.Frame(self)
+        frame.pack(fill="x")
+
+        lbl = tkinter.Label(frame)
+        lbl["text"] = _("Time span (s)")
+        lbl.pack(side="left")
+        txt = tkinter.Spinbox(
+            frame, from_=10, to=3600, increment=10, width=5, state="readonly"
+        )
+        txt["textvariable"] = self.var_span
+        txt.pack(side="left")
+
+        btn = tkinter.Button(frame)
+        btn["command"] = self.clear
+        btn["text"] = _("Clear")
+        btn.pack(side="right")
+
+        self.frm_legend = tkinter.Frame(self)
+        self.frm_legend.pack(fill="x")
+
+        self.canvas = tkinter.Canvas(self)
+        self.canvas["background"] = "white"
+        self.canvas["height"] = 250
+        self.canvas["width"] = 600
+        self.canvas.pack(fill="both", expand=True)
+
+        # Beschriftung der Achsen
+        self.txt_max = self.canvas.create_text(2, 2, anchor="nw")
+        self.txt_min = self.canvas.create_text(2, 0, anchor="sw")
+        self.txt_span = self.canvas.create_text(0, 0, anchor="se")
+
+    def _draw(self):
+        u"""Zeichnet alle Verläufe neu."""
+        keys = tuple(self.dict_series)
+        if keys != self.__keys:
+            self.__keys = keys
+            self._createlegend()
+
+        width = self.canvas.winfo_width()
+        height = self.canvas.winfo_height()
+        plotwidth = width - self.margin
+        if plotwidth <= 1 or height <= 1:
+            return None
+
+        # Daten aller Verläufe kopieren, der Abfragethread schreibt weiter
+        lst_data = []
+        for key in keys:
+            times, values = self.dict_series[key].getdata()
+            if times:
+                lst_data.append((key, times, values))
+        if not lst_data:
+            return None
+
+        t_end = max(times[-1] for key, times, values in lst_data)
+        t_start = t_end - self.var_span.get()
+
+        dict_cols = {
+            key: _decimate(times, values, t_start, t_end, plotwidth)
+            for key, times, values in lst_data
+        }
+        lst_min = [c[1] for cols in dict_cols.values() for c in cols]
+        lst_max = [c[2] for cols in dict_cols.values() for c in cols]
+        if not lst_min:
+            return None
+        y_min = min(lst_min)
+        y_max = max(lst_max)
+        scale = (height - 4) / (y_max - y_min) if y_max > y_min else 0
+
+        for key, cols in dict_cols.items():
+            if key not in self.__dict_lines:
+                continue
+            coords = []
+            for col, c_min, c_max in cols:
+                x = self.margin + col
+                coords.extend((
+                    x, height - 2 - (c_min - y_min) * scale,
+                    x, height - 2 - (c_max - y_min) * scale,
+                ))
+            if len(coords) < 4:
+                coords = [0, 0, 0, 0]
+            self.canvas.coords(self.__dict_lines[key], *coords)
+
+        self.canvas.itemconfigure(self.txt_max, text="{0:g}".format(y_max))
+        self.canvas.itemconfigure(self.txt_min, text="{0:g}".format(y_min))
+        self.canvas.coords(self.txt_min, 2, height - 2)
+        self.canvas.itemconfigure(
+            self.txt_span, text="-{0} s".format(self.var_span.get())
+        )
+        self.canvas.coords(self.txt_span, width - 2, height - 2)
+
+    def clear(self):
+        u"""Verwirft die Werte aller Verläufe."""
+        for series in self.dict_series.values():
+            series.clear()
+
+    def destroy(self):
+        u"""Beendet den Timer und zerstört das Frame."""
+        if self.__tmr_draw is not None:
+            self.after_cancel(self.__tmr_draw)
+            self.__tmr_draw = None
+        super().destroy()
+
+    def tmr_draw(self):
+        u"""Timer zum Neuzeichnen der Verläufe."""
+        self._draw()
+        self.__tmr_draw = self.after(self.interval, self.tmr_draw)
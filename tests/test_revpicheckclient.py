@@ -0,0 +1,335 @@
+# -*- coding: utf-8 -*-
+u"""Prüft Umwandlung, Änderungserkennung und Suche der IOs im 'watch modus'.
+
+Aufruf: python3 -m unittest discover tests
+
+"""
+
+__author__ = "Sven Sager"
+__copyright__ = "Copyright (C) 2018 Sven Sager"
+__license__ = "GPLv3"
+
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "revpipycontrol"
+))
+from revpicheckclient import IOChangeLog, IODecoder, IOEntry, IOIndex, \
+    _decodeio, _encodeio
+
+
+def _olddecode(ba_values, io):
+    u"""Bisherige Umwandlung eines IOs über int.from_bytes() als Vergleich.
+
+    @param ba_values Prozessabbild als bytearray()
+    @param io IOEntry des IOs
+    @return Wert des IOs
+
+    """
+    int_byte = int.from_bytes(
+        ba_values[io.baddr:io.baddr + io.blen],
+        byteorder=io.byteorder, signed=io.signed
+    )
+    return int_byte if io.bitaddr < 0 else bool(int_byte & 1 << io.bitaddr)
+
+
+def _layout(rnd, count, imglen, device=32):
+    u"""Erzeugt zufällige IOs mit Überlappungen und gemischter Byteorder.
+
+    @param rnd random.Random() Instanz
+    @param count Anzahl der IOs
+    @param imglen Länge des Prozessabbilds
+    @param device Deviceposition der IOs
+    @return list() der IOEntry
+
+    """
+    lst_io = []
+    for i in range(count):
+        blen = rnd.choice([1, 1, 2, 2, 3, 4, 4, 5, 8])
+        bitaddr = -1 if rnd.random() < 0.6 else rnd.randrange(blen * 8 + 4)
+        lst_io.append(IOEntry([
+            "io{0}".format(i), blen, rnd.randrange(imglen - blen), "",
+            bitaddr, rnd.choice(["little", "big"]), rnd.random() < 0.5
+        ], device))
+    return lst_io
+
+
+def _image(rnd, imglen):
+    u"""Erzeugt ein zufälliges Prozessabbild.
+    @param rnd random.Random() Instanz
+    @param imglen Länge des Prozessabbilds
+    @return bytearray()"""
+    return bytearray(rnd.getrandbits(8) for i in range(imglen))
+
+
+class TestIOEntry(unittest.TestCase):
+
+    u"""Vorberechnete Werte der IOEntry."""
+
+    def test_bitmask(self):
+        u"""Byte und Maske entsprechen dem Bit im ganzen Wert."""
+        rnd = random.Random(1)
+        for blen in (1, 2, 3, 4):
+            for border in ("little", "big"):
+                for bitaddr in range(blen * 8):
+                    io = IOEntry(["bit", blen, 10, "", bitaddr, border])
+                    for i in range(5):
+                        ba = _image(rnd, 16)
+                        self.assertEqual(
+                            bool(ba[io.byte] & io.mask),
+                            _olddecode(ba, io), (blen, border, bitaddr)
+                        )
+
+        # Bits außerhalb der Bytelänge haben kein Byte
+        io = IOEntry(["bit", 1, 10, "", 9, "little", False])
+        self.assertEqual(io.byte, -1)
+        self.assertEqual(io.mask, 0)
+
+    def test_defaults(self):
+        u"""Ältere Layouts ohne Byteorder und Vorzeichen."""
+        io = IOEntry(["old", 2, 4, "bmk", -1], 33)
+        self.assertEqual(io.byteorder, "little")
+        self.assertFalse(io.signed)
+        self.assertEqual(io.slc, slice(4, 6))
+        self.assertEqual(io.device, 33)
+        self.assertEqual(io.value, 0)
+        self.assertIs(IOEntry(["old", 1, 4, "", 0]).value, False)
+
+    def test_minmax(self):
+        u"""Wertebereich für Bytes max 22, sonst 0."""
+        io = IOEntry(["w", 2, 0, "", -1, "little", False])
+        self.assertEqual((io.min, io.max), (0, 65535))
+        io = IOEntry(["w", 2, 0, "", -1, "big", True])
+        self.assertEqual((io.min, io.max), (-32768, 32767))
+        io = IOEntry(["b", 1, 0, "", -1, "little", True])
+        self.assertEqual((io.min, io.max), (-128, 127))
+        for blen in (0, 23):
+            io = IOEntry(["x", blen, 0, "", -1, "little", False])
+            self.assertEqual((io.min, io.max), (0, 0))
+
+
+class TestIODecoder(unittest.TestCase):
+
+    u"""Vorkompilierte Umwandlung im Vergleich zu int.from_bytes()."""
+
+    def _assertdecode(self, lst_io, ba_values):
+        u"""Vergleicht decode() mit der bisherigen Umwandlung.
+        @param lst_io list() der IOEntry
+        @param ba_values Prozessabbild als bytearray()"""
+        dec = IODecoder(lst_io)
+        self.assertEqual(
+            sorted(id(io) for io in dec.lst_io),
+            sorted(id(io) for io in lst_io)
+        )
+        values = dec.decode(ba_values)
+        self.assertEqual(len(values), len(dec.lst_io))
+        for io, value in zip(dec.lst_io, values):
+            self.assertEqual(value, _olddecode(ba_values, io), io.name)
+            self.assertIs(type(value), type(_olddecode(ba_values, io)))
+            self.assertEqual(value, _decodeio(ba_values, io), io.name)
+
+    def test_empty(self):
+        u"""Device ohne IOs."""
+        dec = IODecoder([])
+        self.assertEqual(dec.slc, slice(0, 0))
+        self.assertEqual(dec.decode(bytearray(8)), [])
+
+    def test_fuzz(self):
+        u"""Zufällige Layouts mit Überlappungen und Abbildern."""
+        rnd = random.Random(2)
+        for i in range(200):
+            imglen = rnd.randint(16, 96)
+            lst_io = _layout(rnd, rnd.randint(1, 40), imglen)
+            dec = IODecoder(lst_io)
+            self.assertEqual(dec.slc.start, min(io.baddr for io in lst_io))
+            self.assertEqual(dec.slc.stop, max(io.slc.stop for io in lst_io))
+            for j in range(3):
+                self._assertdecode(lst_io, _image(rnd, imglen))
+
+    def test_overlap(self):
+        u"""Überlappende Standard-IOs werden einzeln umgewandelt."""
+        lst_io = [
+            IOEntry(["a", 2, 0, "", -1, "little", False]),
+            IOEntry(["b", 2, 1, "", -1, "little", True]),
+            IOEntry(["c", 4, 0, "", -1, "big", False]),
+            IOEntry(["d", 1, 3, "", -1, "big", True]),
+            IOEntry(["e", 2, 2, "", 9, "big", False]),
+        ]
+        self._assertdecode(lst_io, bytearray(b'\x81\xff\x7f\x80\x01'))
+        self._assertdecode(lst_io, bytearray(b'\x00\x80\x00\xff\x02'))
+
+
+class TestEncodeIO(unittest.TestCase):
+
+    u"""Umwandlung von Output Werten in Bytes für ps_setbytes."""
+
+    def test_encode(self):
+        u"""Byte-IOs werden zurück umgewandelt, Bit-IOs nie."""
+        rnd = random.Random(3)
+        for io in _layout(rnd, 300, 64):
+            ba = bytearray(64)
+            value = rnd.randint(io.min, io.max)
+            bytebuff = _encodeio(io, value)
+            if io.bitaddr >= 0:
+                self.assertIsNone(bytebuff)
+                continue
+            self.assertEqual(len(bytebuff), io.blen)
+            ba[io.slc] = bytebuff
+            self.assertEqual(_olddecode(ba, io), value)
+
+        # Werte außerhalb des Wertebereichs
+        io = IOEntry(["w", 1, 0, "", -1, "little", False])
+        self.assertIsNone(_encodeio(io, 256))
+        self.assertIsNone(_encodeio(io, -1))
+        self.assertEqual(_encodeio(io, True), b'\x01')
+
+
+class TestIOChangeLog(unittest.TestCase):
+
+    u"""Erkennung geänderter IOs zwischen zwei Prozessabbildern."""
+
+    def test_events(self):
+        u"""Nur IOs mit geändertem Wert werden gemeldet."""
+        dict_inps = {32: [
+            IOEntry(["i_bit", 1, 0, "", 2, "little", False], 32),
+            IOEntry(["i_word", 2, 1, "", -1, "big", False], 32),
+        ]}
+        dict_outs = {33: [
+            IOEntry(["o_bit", 2, 4, "", 9, "little", False], 33),
+        ]}
+        log = IOChangeLog(dict_inps, dict_outs, 8, maxlen=3)
+        ba = bytearray(8)
+        self.assertEqual(log.feed(ba, 1.0), 0)
+
+        # Anderes Bit im gleichen Byte ändert keinen IO-Wert
+        ba[0] = 0x01
+        self.assertEqual(log.feed(ba, 2.0), 0)
+
+        ba[0] |= 0x04
+        ba[2] = 0x10
+        ba[5] = 0x02
+        self.assertEqual(log.feed(ba, 3.0), 3)
+        cnt, lst_events = log.getnew(0)
+        self.assertEqual(cnt, 3)
+        self.assertEqual(
+            sorted((ts, dev, io.name, old, new)
+                   for ts, dev, io, old, new in lst_events),
+            [(3.0, 32, "i_bit", False, True),
+             (3.0, 32, "i_word", 0, 16),
+             (3.0, 33, "o_bit", False, True)]
+        )
+
+        # Ringpuffer mit maxlen, getnew nur für neue Änderungen
+        ba[0] = 0
+        self.assertEqual(log.feed(ba, 4.0), 1)
+        cnt, lst_events = log.getnew(cnt)
+        self.assertEqual(cnt, 4)
+        self.assertEqual(
+            [(ts, io.name, old, new) for ts, dev, io, old, new in lst_events],
+            [(4.0, "i_bit", True, False)]
+        )
+        self.assertEqual(len(log.events), 3)
+        self.assertEqual(len(log.getnew(0)[1]), 3)
+
+        # Abbilder anderer Länge werden nicht verglichen
+        self.assertEqual(log.feed(ba[:4], 5.0), 0)
+        log.clear()
+        self.assertEqual(log.getnew(cnt), (4, []))
+
+    def test_fuzz(self):
+        u"""Änderungen entsprechen dem Vergleich aller IOs."""
+        rnd = random.Random(4)
+        for i in range(50):
+            imglen = rnd.randint(16, 80)
+            lst_io = _layout(rnd, 30, imglen)
+            log = IOChangeLog({32: lst_io[:15]}, {33: lst_io[15:]}, imglen)
+            ba_last = _image(rnd, imglen)
+            log.feed(ba_last, 0.0)
+            cnt = 0
+            for j in range(10):
+                ba = bytearray(ba_last)
+                for k in range(rnd.randint(0, 4)):
+                    ba[rnd.randrange(imglen)] ^= 1 << rnd.randrange(8)
+
+                expected = sorted(
+                    (io.name, _olddecode(ba_last, io), _olddecode(ba, io))
+                    for io in lst_io
+                    if _olddecode(ba_last, io) != _olddecode(ba, io)
+                )
+                self.assertEqual(log.feed(ba, j + 1.0), len(expected))
+                cnt, lst_events = log.getnew(cnt)
+                self.assertEqual(sorted(
+                    (io.name, old, new) for ts, dev, io, old, new in lst_events
+                ), expected)
+                ba_last = ba
+
+
+class TestIOIndex(unittest.TestCase):
+
+    u"""Suche über Namen und BMK."""
+
+    def setUp(self):
+        u"""Erstellt den Index über einige IOs."""
+        self.dict_inps = {32: [
+            IOEntry(["I_1", 1, 0, "Taster Start", 0], 32),
+            IOEntry(["I_2", 1, 0, "", 1], 32),
+            IOEntry(["Temp_Kessel", 2, 1, "B1", -1], 32),
+        ]}
+        self.dict_outs = {33: [
+            IOEntry(["O_1", 1, 3, "Lampe Start", 0], 33),
+            IOEntry(["Motor_Kessel", 1, 3, "M1", 1], 33),
+        ]}
+        self.index = IOIndex(self.dict_inps, self.dict_outs)
+
+    def _names(self, text, maxresults=100):
+        u"""Sucht und gibt die Namen der Treffer zurück.
+        @param text Suchtext
+        @param maxresults Maximale Anzahl der Ergebnisse
+        @return list() der Namen"""
+        return [io.name for io in self.index.search(text, maxresults)]
+
+    def test_search(self):
+        u"""Präfixe zuerst, dann Teilstrings ohne doppelte Treffer."""
+        self.assertEqual(self._names("i_"), ["I_1", "I_2"])
+        self.assertEqual(self._names("  KESSEL "), [
+            "Motor_Kessel", "Temp_Kessel"
+        ])
+        self.assertEqual(self._names("kessel")[0], "Motor_Kessel")
+        self.assertEqual(self._names("m"), [
+            "Motor_Kessel", "O_1", "Temp_Kessel"
+        ])
+        self.assertEqual(self._names("start"), ["O_1", "I_1"])
+        self.assertEqual(self._names("_1"), ["I_1", "O_1"])
+        self.assertEqual(self._names("b1"), ["Temp_Kessel"])
+        self.assertEqual(len(self._names("e", 2)), 2)
+        self.assertEqual(self._names("unbekannt"), [])
+        self.assertEqual(self._names(""), [])
+        self.assertEqual(self._names("a\nb"), [])
+
+    def test_fuzz(self):
+        u"""Treffer entsprechen einer Suche über alle IOs."""
+        rnd = random.Random(5)
+        lst_io = []
+        for dev in (32, 33):
+            for i in range(200):
+                lst_io.append(IOEntry([
+                    "".join(rnd.choice("abcAB_1") for j in range(6)), 1, 0,
+                    "".join(rnd.choice("abc ") for j in range(3)), -1
+                ], dev))
+        index = IOIndex({32: lst_io[:200]}, {33: lst_io[200:]})
+        for text in ("a", "ab", "B_", "_1", "c a", "1a", "aaa"):
+            expected = {
+                id(io) for io in lst_io
+                if text.lower() in io.name.lower() or
+                text.lower() in io.bmk.lower()
+            }
+            lst_result = index.search(text, 1000)
+            self.assertEqual(len(lst_result), len(expected), text)
+            self.assertEqual({id(io) for io in lst_result}, expected, text)
+
+
+if __name__ == "__main__":
+    unittest.main()
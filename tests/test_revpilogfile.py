@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+u"""Prüft das blockweise Laden der Logbücher gegen ein simuliertes Logbuch.
+
+Aufruf: python3 -m unittest discover tests
+
+"""
+
+__author__ = "Sven Sager"
+__copyright__ = "Copyright (C) 2018 Sven Sager"
+__license__ = "GPLv3"
+
+import os
+import sys
+import unittest
+from xmlrpc.client import Binary
+
+sys.path.insert(0, os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "revpipycontrol"
+))
+from revpilogfile import _fetchlog, _lastlines, _linestart, _logsize, \
+    _tailposition
+
+
+def _logdata(lines, text="Zyklus {0:06d} Ausgänge gesetzt\n"):
+    u"""Erzeugt ein Logbuch mit Umlauten.
+    @param lines Anzahl der Zeilen
+    @param text Format einer Zeile
+    @return <class 'bytes'>"""
+    return "".join(text.format(i) for i in range(lines)).encode("utf-8")
+
+
+class _LoadLog():
+
+    u"""Simuliert load_applog von RevPiPyLoad und zählt die Aufrufe."""
+
+    def __init__(self, data, access=True):
+        u"""Init _LoadLog class.
+        @param data Inhalt der Logdatei als bytes
+        @param access False, wenn kein Zugriff auf die Logdatei besteht"""
+        self.access = access
+        self.calls = 0
+        self.data = data
+
+    def __call__(self, start, count):
+        u"""Liefert count Bytes ab start wie der RevPi.
+        @param start Startposition
+        @param count Anzahl der Bytes
+        @return Binary()"""
+        self.calls += 1
+        if not self.access:
+            return Binary(b'\x16')
+        if start > len(self.data):
+            return Binary(b'\x19')
+        return Binary(self.data[start:start + count])
+
+
+class TestFetchLog(unittest.TestCase):
+
+    u"""Blockweiser Download mit inkrementeller Dekodierung."""
+
+    def test_blocks(self):
+        u"""Feste und wachsende Blockgröße liefern das ganze Logbuch."""
+        data = _logdata(5000)
+        xmlcall = _LoadLog(data)
+        text, position, ctrl = _fetchlog(xmlcall, 0, 1000)
+        self.assertEqual(text, data.decode("utf-8"))
+        self.assertEqual(position, len(data))
+        self.assertIsNone(ctrl)
+        calls = xmlcall.calls
+
+        xmlcall.calls = 0
+        text, position, ctrl = _fetchlog(xmlcall, 0, 1000, 64000)
+        self.assertEqual(text, data.decode("utf-8"))
+        self.assertEqual(position, len(data))
+        self.assertLess(xmlcall.calls, calls // 10)
+
+        # Keine neuen Daten
+        self.assertEqual(
+            _fetchlog(xmlcall, len(data), 1000), ("", len(data), None)
+        )
+
+    def test_control(self):
+        u"""Steuerzeichen des RevPi werden mit der Startposition gemeldet."""
+        self.assertEqual(
+            _fetchlog(_LoadLog(b'', False), 0, 100), ("", 0, b'\x16')
+        )
+        self.assertEqual(
+            _fetchlog(_LoadLog(b'abc\n'), 10, 100), ("", 10, b'\x19')
+        )
+
+    def test_endposition(self):
+        u"""Nur bis endposition laden."""
+        data = _logdata(100)
+        text, position, ctrl = _fetchlog(_LoadLog(data), 50, 7, 64, 1000)
+        self.assertLessEqual(position, 1000)
+        self.assertGreater(position, 996)
+        self.assertEqual(text.encode("utf-8"), data[50:position])
+        self.assertEqual(_fetchlog(_LoadLog(data), 80, 7, None, 80)[:2],
+                         ("", 80))
+
+    def test_utf8(self):
+        u"""Geteilte UTF-8 Zeichen werden beim nächsten Abruf geladen."""
+        data = "äöü€\n".encode("utf-8") * 200
+        for loadblock in range(1, 12):
+            xmlcall = _LoadLog(data[:len(data) // 2 + 1])
+            lst_text = []
+            position = 0
+            for i in range(2):
+                text, position, ctrl = _fetchlog(
+                    xmlcall, position, loadblock, 64
+                )
+                lst_text.append(text)
+                xmlcall.data = data
+            self.assertEqual("".join(lst_text), data.decode("utf-8"))
+            self.assertEqual(position, len(data))
+
+
+class TestLogPosition(unittest.TestCase):
+
+    u"""Größe, Zeilenanfang und Ende des Logbuchs ohne Download."""
+
+    def test_lastlines(self):
+        u"""Kürzen auf die letzten Zeilen mit Länge in Bytes."""
+        text = "ä1\nb2\nc3\n"
+        self.assertEqual(_lastlines(text, 3), (text, 0, 0))
+        self.assertEqual(_lastlines(text, 2), ("b2\nc3\n", 1, 4))
+        self.assertEqual(_lastlines(text, 1), ("c3\n", 2, 7))
+        self.assertEqual(_lastlines(text, 0), ("", 3, 10))
+
+        # Eine angefangene letzte Zeile bleibt zusätzlich stehen
+        self.assertEqual(_lastlines("a\nb\nteil", 1), ("b\nteil", 1, 2))
+        self.assertEqual(_lastlines("", 5), ("", 0, 0))
+
+    def test_linestart(self):
+        u"""Beginn der ersten Zeile ab einer Position."""
+        data = b'ab\ncde\n\nfg'
+        xmlcall = _LoadLog(data)
+        for loadblock in (1, 2, 100):
+            for position, expected in (
+                    (0, 0), (1, 3), (3, 3), (4, 7), (7, 7), (8, 8),
+                    (9, 10), (10, 10)):
+                self.assertEqual(
+                    _linestart(xmlcall, position, loadblock), expected,
+                    (position, loadblock)
+                )
+
+            # Ohne Zeilenumbruch bis endposition
+            self.assertEqual(_linestart(xmlcall, 4, loadblock, 6), 6)
+            self.assertEqual(_linestart(xmlcall, 4, loadblock, 8), 7)
+
+    def test_logsize(self):
+        u"""Position höchstens accuracy Bytes vor dem Dateiende."""
+        for size in (1, 2, 7, 100, 4095, 4096, 4097, 100000):
+            for accuracy in (1, 16, 4096):
+                xmlcall = _LoadLog(b'x' * size)
+                position = _logsize(xmlcall, accuracy)
+                self.assertLess(position, size, (size, accuracy))
+                self.assertLessEqual(
+                    size - position, accuracy, (size, accuracy)
+                )
+        self.assertEqual(_logsize(_LoadLog(b''), 16), 0)
+        self.assertIsNone(_logsize(_LoadLog(b'', False), 16))
+
+        # Nur kurze Abrufe auch bei großen Dateien
+        xmlcall = _LoadLog(b'x' * 10000000)
+        _logsize(xmlcall, 16384)
+        self.assertLess(xmlcall.calls, 40)
+
+    def test_tailposition(self):
+        u"""Ende des Logbuchs ab einem Zeilenanfang."""
+        data = _logdata(20000)
+        for tailsize in (1000, 65536, 262144):
+            xmlcall = _LoadLog(data)
+            position = _tailposition(xmlcall, tailsize, 4096)
+            self.assertEqual(data[position - 1:position], b'\n')
+            self.assertGreaterEqual(len(data) - position, tailsize - 100)
+            self.assertLessEqual(len(data) - position, tailsize + 4096)
+
+        # Kleine Logbücher ganz laden
+        self.assertEqual(_tailposition(_LoadLog(data), len(data), 4096), 0)
+        self.assertEqual(_tailposition(_LoadLog(b''), 1000, 4096), 0)
+        self.assertEqual(_tailposition(_LoadLog(b'', False), 1000, 4096), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+u"""Schreibt Aufzeichnungen und liest sie über seek() wieder ein.
+
+Aufruf: python3 -m unittest discover tests
+
+"""
+
+__author__ = "Sven Sager"
+__copyright__ = "Copyright (C) 2018 Sven Sager"
+__license__ = "GPLv3"
+
+import os
+import random
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "revpipycontrol"
+))
+from revpirecord import ImageRecorder, ImageReplay, _hdr, _rec, _trailer
+
+
+def _images(count, imglen, seed=1, lenchanges=None):
+    u"""Erzeugt Prozessabbilder, in denen sich wenige Bytes ändern.
+
+    @param count Anzahl der Abbilder
+    @param imglen Länge der Abbilder
+    @param seed Startwert des Zufallsgenerators
+    @param lenchanges <class 'dict'> Index: neue Länge ab diesem Abbild
+    @return <class 'list'> mit (zeitstempel, bytes) Einträgen
+
+    """
+    rnd = random.Random(seed)
+    lenchanges = lenchanges or {}
+    ba = bytearray(rnd.getrandbits(8) for i in range(imglen))
+    lst_images = []
+    for i in range(count):
+        if i in lenchanges:
+            imglen = lenchanges[i]
+            ba = bytearray(rnd.getrandbits(8) for i in range(imglen))
+        for j in range(rnd.randint(0, 4)):
+            ba[rnd.randrange(imglen)] = rnd.getrandbits(8)
+        lst_images.append((1000.0 + i * 0.5, bytes(ba)))
+    return lst_images
+
+
+class TestRecordReplay(unittest.TestCase):
+
+    u"""Round-Trip von ImageRecorder nach ImageReplay."""
+
+    def setUp(self):
+        u"""Legt ein temporäres Verzeichnis für die Aufzeichnungen an."""
+        self.tmpdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmpdir, "record.rpir")
+
+    def tearDown(self):
+        u"""Entfernt das temporäre Verzeichnis."""
+        shutil.rmtree(self.tmpdir)
+
+    def _record(self, lst_images, filename=None, **kwargs):
+        u"""Schreibt alle Abbilder und schließt die Aufzeichnung.
+
+        @param lst_images <class 'list'> mit (zeitstempel, bytes)
+        @param filename Dateiname, sonst self.filename
+        @param kwargs Weitere Parameter für ImageRecorder
+
+        """
+        recorder = ImageRecorder(filename or self.filename, **kwargs)
+        for ts, ba in lst_images:
+            self.assertTrue(recorder.write(bytearray(ba), ts))
+        recorder.close()
+        self.assertFalse(recorder.write(bytearray(lst_images[-1][1])))
+
+    def _replay(self, filename=None):
+        u"""Öffnet eine Aufzeichnung und schließt sie nach dem Test.
+
+        @param filename Dateiname, sonst self.filename
+        @return ImageReplay()
+
+        """
+        replay = ImageReplay(filename or self.filename)
+        self.addCleanup(replay.close)
+        return replay
+
+    def _assertseek(self, replay, lst_images, seed=2):
+        u"""Prüft seek() auf exakte, dazwischen liegende und äußere Zeiten.
+
+        @param replay ImageReplay()
+        @param lst_images Erwartete (zeitstempel, bytes) der Aufzeichnung
+        @param seed Startwert für die zufällige Reihenfolge
+
+        """
+        lst_seek = []
+        for i, (ts, ba) in enumerate(lst_images):
+            lst_seek.append((ts, i))
+            lst_seek.append((ts + 0.25, i))
+        random.Random(seed).shuffle(lst_seek)
+
+        # Vor dem Anfang das erste und nach dem Ende das letzte Abbild
+        lst_seek.append((0.0, 0))
+        lst_seek.append((lst_images[-1][0] + 3600.0, len(lst_images) - 1))
+
+        for timestamp, i in lst_seek:
+            ts, ba = replay.seek(timestamp)
+            self.assertEqual(ts, lst_images[i][0], timestamp)
+            self.assertEqual(bytes(ba), lst_images[i][1], timestamp)
+
+    def _readall(self, replay):
+        u"""Liest alle Abbilder ab dem Anfang über next().
+
+        @param replay ImageReplay()
+        @return <class 'list'> mit (zeitstempel, bytes)
+
+        """
+        lst_read = [replay.seek(replay.tm_start)]
+        while True:
+            ts = replay.peek()
+            rc = replay.next()
+            if rc is None:
+                self.assertIsNone(ts)
+                break
+            self.assertEqual(ts, rc[0])
+            lst_read.append(rc)
+        return [(ts, bytes(ba)) for ts, ba in lst_read]
+
+    def test_badfile(self):
+        u"""Fremde und leere Dateien werden abgelehnt."""
+        with open(self.filename, "wb") as fh:
+            fh.write(b'no recording')
+        with self.assertRaises(ValueError):
+            ImageReplay(self.filename)
+
+        ImageRecorder(self.filename).close()
+        with self.assertRaises(ValueError):
+            ImageReplay(self.filename)
+
+    def test_imglen(self):
+        u"""Geänderte Abbildlänge erzwingt ein komplettes Abbild."""
+        lst_images = _images(120, 64, lenchanges={30: 80, 61: 48})
+        self._record(lst_images, keyinterval=50, indexinterval=2)
+
+        replay = self._replay()
+        self.assertIn(lst_images[30][0], replay.lst_ts)
+        self.assertIn(lst_images[61][0], replay.lst_ts)
+        self._assertseek(replay, lst_images)
+        self.assertEqual(self._readall(replay), lst_images)
+
+    def test_notrailer(self):
+        u"""Ohne Abschluss wird der Index aus den Datensätzen aufgebaut."""
+        lst_images = _images(80, 32)
+        self._record(lst_images, keyinterval=7, indexinterval=3)
+        with open(self.filename, "rb") as fh:
+            data = fh.read()
+
+        # Abgebrochene Aufzeichnung mit angefangenem Datensatz
+        with open(self.filename, "wb") as fh:
+            fh.write(data[:-_trailer.size])
+            fh.write(_rec.pack(1, 9999.0, 100) + b'\x00' * 10)
+        replay = self._replay()
+        self.assertEqual(replay.tm_start, lst_images[0][0])
+        self.assertEqual(replay.tm_end, lst_images[-1][0])
+        self._assertseek(replay, lst_images)
+        self.assertEqual(self._readall(replay), lst_images)
+        replay.close()
+
+        # An beliebiger Stelle abgeschnitten bleibt ein Anfang lesbar
+        firstrec = _hdr.size + _rec.size + len(lst_images[0][1])
+        for size in range(_hdr.size, len(data), 37):
+            with open(self.filename, "wb") as fh:
+                fh.write(data[:size])
+            if size < firstrec:
+                with self.assertRaises(ValueError):
+                    ImageReplay(self.filename)
+                continue
+
+            replay = ImageReplay(self.filename)
+            lst_read = self._readall(replay)
+            self.assertEqual(lst_read, lst_images[:len(lst_read)], size)
+            self.assertEqual(replay.tm_end, lst_read[-1][0])
+            self._assertseek(replay, lst_read)
+            replay.close()
+
+    def test_rollover(self):
+        u"""Bei maxsize wird nach <datei>.1 gewechselt, beide sind lesbar."""
+        lst_images = _images(400, 64)
+        self._record(
+            lst_images, keyinterval=10, indexinterval=2, maxsize=4096
+        )
+        self.assertTrue(os.path.exists(self.filename + ".1"))
+        self.assertGreaterEqual(os.path.getsize(self.filename + ".1"), 4096)
+
+        older = self._replay(self.filename + ".1")
+        newer = self._replay()
+        lst_older = self._readall(older)
+        lst_newer = self._readall(newer)
+
+        # Die Dateien setzen lückenlos fort und enden mit dem letzten Abbild
+        lst_read = lst_older + lst_newer
+        self.assertEqual(lst_read, lst_images[-len(lst_read):])
+        self.assertEqual(older.tm_end, lst_older[-1][0])
+        self.assertEqual(newer.tm_start, lst_newer[0][0])
+        self.assertEqual(newer.tm_end, lst_images[-1][0])
+        self._assertseek(older, lst_older)
+        self._assertseek(newer, lst_newer)
+
+    def test_seek(self):
+        u"""seek() liefert das letzte Abbild bis zum Zeitstempel."""
+        lst_images = _images(200, 48)
+        self._record(lst_images, keyinterval=7, indexinterval=3)
+
+        replay = self._replay()
+        self.assertEqual(replay.tm_start, lst_images[0][0])
+        self.assertEqual(replay.tm_end, lst_images[-1][0])
+        self.assertEqual(
+            replay.lst_ts, [ts for ts, ba in lst_images[::7]]
+        )
+        self._assertseek(replay, lst_images)
+        self.assertEqual(self._readall(replay), lst_images)
+
+
+if __name__ == "__main__":
+    unittest.main()